@@ -3,13 +3,19 @@ import json
 import random
 import asyncio
 import re
+import functools
+import contextlib
+import time
+import traceback
+import contextvars
+import secrets
+import hashlib
 from datetime import datetime, timedelta, timezone, date
 from typing import Optional, Dict, List, Tuple, Any
 
 import discord
 from discord.ext import tasks
 from discord import app_commands
-import requests
 from urllib.parse import urlparse
 
 # External deps
@@ -17,6 +23,9 @@ import aiohttp
 import html
 import urllib.parse
 import sqlite3  # NEW
+import threading
+from collections import deque
+import heapq
 
 try:
     from zoneinfo import ZoneInfo
@@ -27,12 +36,14 @@ except Exception:
 DATA_PATH = os.environ.get("DATA_PATH", "/app/data/db.json")
 DB_PATH = os.environ.get("DB_PATH", "/app/data/bot.db")
 GUILD_IDS: List[int] = []  # e.g., [123456789012345678] for faster guild sync
+FORCE_COMMAND_SYNC = os.environ.get("FORCE_COMMAND_SYNC", "").lower() in ("1", "true", "yes")
 
 KUTT_API_KEY = os.getenv("KUTT_API_KEY")
 KUTT_BASE_URL = os.getenv("KUTT_BASE_URL", "https://kutt.it").rstrip("/")
 KUTT_LINK_DOMAIN = os.getenv("KUTT_LINK_DOMAIN")  # optional
 
 STARTING_DAILY = 250
+DAILY_COOLDOWN_HOURS = 20
 PVP_TIMEOUT = 120
 WORK_COOLDOWN_MINUTES = 60
 WORK_MIN_PAY = 80
@@ -71,7 +82,10 @@ OFFLINE_TRIVIA = [
 ]
 
 DEFAULT_TZ_NAME = "America/Chicago"
-REMINDER_TICK_SECONDS = 10
+REMINDER_MAX_SLEEP_SECONDS = 60  # reminder scheduler re-checks at least this often
+CLEANUP_CONCURRENCY = 8  # channels purged in parallel by the auto-delete loop
+CLEANUP_PURGE_LIMIT = 1000  # expired messages looked at per channel per pass
+CLEANUP_RECHECK_SECONDS = 3600  # idle auto-delete channels still get a full pass this often (e.g. after unpins)
 
 intents = discord.Intents.default()
 intents.guilds = True
@@ -113,6 +127,8 @@ WX_CODE_MAP = {
     99: ("⛈️", "Severe thunderstorm with hail"),
 }
 
+_NON_DIGITS_RE = re.compile(r"[^0-9]")  # ZIP cleanup
+
 def wx_icon_desc(code: int):
     icon, desc = WX_CODE_MAP.get(int(code), ("🌡️", "Weather"))
     return icon, desc
@@ -183,18 +199,90 @@ def weighted_choice(pairs: List[Tuple[str, float]]) -> str:
     return pairs[-1][0]
 
 # ---------- SQLite Store (drop-in replacement for JSON) ----------
+# Compact encoding for JSON blobs in the DB (polls are rewritten on every vote)
+_json_compact = functools.partial(json.dumps, separators=(",", ":"), ensure_ascii=False)
+
+def _to_epoch(v) -> Optional[int]:
+    # Cooldown columns now hold epoch seconds; rows written before that hold ISO strings
+    if v is None or v == "":
+        return None
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        pass
+    try:
+        dt = datetime.fromisoformat(str(v))
+        return int((dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp())
+    except ValueError:
+        return None
+
+def _locked(fn):
+    # Store methods can run on the loop thread or via asyncio.to_thread; mutators hold
+    # Store._lock so a write never lands inside another thread's BEGIN..COMMIT.
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return fn(self, *args, **kwargs)
+    return wrapper
+
 class Store:
     def __init__(self, json_path: str):
         self.json_path = json_path
         os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
         self.db = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
         self.db.execute("PRAGMA journal_mode=WAL;")
+        # WAL + NORMAL: commits no longer fsync; still crash-safe, at worst the last commits roll back on power loss
+        self.db.execute("PRAGMA synchronous=NORMAL;")
         self.db.execute("PRAGMA foreign_keys=ON;")
+        # Some writes run via asyncio.to_thread; this serializes them against the loop thread
+        # so an explicit BEGIN..COMMIT on the shared connection never picks up a stray statement.
+        self._lock = threading.RLock()
+        self._txn_depth = 0
         self._init_db()
         # Migrate data from JSON if present (first-ever run)
         self._maybe_migrate_from_json()
         # Ensure schema matches per-user ID model (id per user, not global)
         self._migrate_schema_if_needed()
+        self._load_caches()
+
+    def _load_caches(self):
+        # Balances are read on nearly every command; keep them in memory (writes go through to SQLite)
+        self._bal: Dict[int, int] = {int(uid): int(bal) for uid, bal in self.db.execute("SELECT user_id, balance FROM wallets")}
+        # Auto-delete config is consulted on every message; same write-through treatment
+        self._ad: Dict[int, int] = {int(cid): int(secs) for cid, secs in self.db.execute("SELECT channel_id, seconds FROM autodelete")}
+        # W/L/P counters are bumped after every game; mirror them too so results are one UPSERT, not read+write
+        self._stats: Dict[int, list] = {int(uid): [int(w), int(l), int(p)] for uid, w, l, p in self.db.execute("SELECT user_id, wins, losses, pushes FROM stats")}
+        # Open polls, already parsed: a vote is get_poll -> mutate -> save_poll, so skip json.loads each time
+        self._polls: Dict[int, dict] = {int(mid): json.loads(js) for mid, js in self.db.execute("SELECT message_id, json FROM polls WHERE is_open=1")}
+        # (key, limit) -> leaderboard rows; dropped by the writes that could change them
+        self._top: Dict[Tuple[str, int], list] = {}
+        # uid -> {item: qty}, filled the first time a user's inventory is read (fishing checks it 3x a cast)
+        self._inv: Dict[int, Dict[str, int]] = {}
+
+    # ---------- transactions ----------
+    @contextlib.contextmanager
+    def transaction(self):
+        # Groups several writes (e.g. a game's payouts + results) into one commit.
+        # Nested blocks join the outermost one. Don't await inside: the lock is held throughout.
+        with self._lock:
+            if self._txn_depth:
+                self._txn_depth += 1
+                try:
+                    yield
+                finally:
+                    self._txn_depth -= 1
+                return
+            self.db.execute("BEGIN")
+            self._txn_depth = 1
+            try:
+                yield
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                self._load_caches()  # caches were updated write-through; resync with what actually persisted
+                raise
+            finally:
+                self._txn_depth = 0
 
     # ---------- schema ----------
     def _init_db(self):
@@ -213,11 +301,14 @@ class Store:
         c.execute("""CREATE TABLE IF NOT EXISTS pins (channel_id INTEGER PRIMARY KEY, text TEXT NOT NULL)""")
         c.execute("""CREATE TABLE IF NOT EXISTS polls (message_id INTEGER PRIMARY KEY, json TEXT NOT NULL, is_open INTEGER NOT NULL DEFAULT 1)""")
         # Reminders: per-user IDs
-        c.execute("""CREATE TABLE IF NOT EXISTS reminders (user_id INTEGER NOT NULL, id INTEGER NOT NULL, channel_id INTEGER, dm INTEGER NOT NULL, text TEXT NOT NULL, due_utc TEXT NOT NULL, PRIMARY KEY(user_id, id))""")
+        c.execute("""CREATE TABLE IF NOT EXISTS reminders (user_id INTEGER NOT NULL, id INTEGER NOT NULL, channel_id INTEGER, dm INTEGER NOT NULL, text TEXT NOT NULL, due_utc TEXT NOT NULL, due_ts INTEGER, PRIMARY KEY(user_id, id))""")
         c.execute("""CREATE TABLE IF NOT EXISTS admin_allowlist (user_id INTEGER PRIMARY KEY)""")
         c.execute("""CREATE TABLE IF NOT EXISTS weather_zips (user_id INTEGER PRIMARY KEY, zip TEXT NOT NULL)""")
         # Weather subs: per-user IDs
         c.execute("""CREATE TABLE IF NOT EXISTS weather_subs (user_id INTEGER NOT NULL, id INTEGER NOT NULL, zip TEXT NOT NULL, cadence TEXT NOT NULL, hh INTEGER NOT NULL, mi INTEGER NOT NULL, weekly_days INTEGER NOT NULL DEFAULT 7, next_run_utc TEXT, PRIMARY KEY(user_id, id))""")
+        # Leaderboards: let ORDER BY ... LIMIT walk an index instead of sorting the whole table
+        c.execute("""CREATE INDEX IF NOT EXISTS idx_wallets_balance ON wallets(balance DESC)""")
+        c.execute("""CREATE INDEX IF NOT EXISTS idx_stats_wins ON stats(wins DESC)""")
 
     # ---------- shape helper for JSON migration ----------
     def _ensure_shape(self, data: dict) -> dict:
@@ -286,7 +377,7 @@ class Store:
         # polls
         for mid, p in data["polls"].items():
             self.db.execute("INSERT INTO polls(message_id,json,is_open) VALUES(?,?,?)",
-                            (int(mid), json.dumps(p), 1 if p.get("open", True) else 0))
+                            (int(mid), _json_compact(p), 1 if p.get("open", True) else 0))
         # reminders -> per-user IDs, compact
         by_user = {}
         for rid, r in data["reminders"].items():
@@ -364,6 +455,20 @@ class Store:
                                 (int(uid), int(rid), cid, dm, text, due))
             self.db.execute("DROP TABLE reminders")
             self.db.execute("ALTER TABLE reminders_new RENAME TO reminders")
+            cols_r = [r[1] for r in self.db.execute("PRAGMA table_info(reminders)").fetchall()]
+
+        # reminders: epoch seconds alongside the ISO string so due checks are integer compares
+        if "due_ts" not in cols_r:
+            self.db.execute("ALTER TABLE reminders ADD COLUMN due_ts INTEGER")
+        for uid, rid, due in self.db.execute("SELECT user_id, id, due_utc FROM reminders WHERE due_ts IS NULL").fetchall():
+            try:
+                dt = datetime.fromisoformat(str(due))
+                if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
+                ts = int(dt.timestamp())
+            except Exception:
+                ts = 0  # unparseable: fire on the next tick rather than never
+            self.db.execute("UPDATE reminders SET due_ts=? WHERE user_id=? AND id=?", (ts, uid, rid))
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_reminders_due ON reminders(due_ts)")
 
         # weather_subs: move to composite PK (user_id,id) if needed
         cols_w = [r[1] for r in self.db.execute("PRAGMA table_info(weather_subs)").fetchall()]
@@ -401,91 +506,138 @@ class Store:
 
     # ---------- wallets ----------
     def get_balance(self, user_id: int) -> int:
-        row = self.db.execute("SELECT balance FROM wallets WHERE user_id=?", (int(user_id),)).fetchone()
-        return int(row[0]) if row else 0
+        return self._bal.get(int(user_id), 0)
 
-    def add_balance(self, user_id: int, amount: int):
+    @_locked
+    def add_balance(self, user_id: int, amount: int) -> int:
         self.db.execute("""INSERT INTO wallets(user_id,balance) VALUES(?,?)
                            ON CONFLICT(user_id) DO UPDATE SET balance=wallets.balance+excluded.balance""",
                         (int(user_id), int(amount)))
+        new = self._bal[int(user_id)] = self._bal.get(int(user_id), 0) + int(amount)
+        self._drop_top("balance")
+        return new
+
+    @_locked
+    def try_debit(self, user_id: int, amount: int) -> Optional[int]:
+        # Check-and-spend as one conditional UPDATE under the lock; None = insufficient funds
+        cur = self.db.execute("UPDATE wallets SET balance=balance-? WHERE user_id=? AND balance>=?",
+                              (int(amount), int(user_id), int(amount)))
+        if cur.rowcount != 1:
+            return None
+        new = self._bal[int(user_id)] = self._bal[int(user_id)] - int(amount)
+        self._drop_top("balance")
+        return new
 
+    @_locked
     def set_balance(self, user_id: int, amount: int):
         self.db.execute("""INSERT INTO wallets(user_id,balance) VALUES(?,?)
                            ON CONFLICT(user_id) DO UPDATE SET balance=excluded.balance""", (int(user_id), int(amount)))
+        self._bal[int(user_id)] = int(amount)
+        self._drop_top("balance")
 
     # ---------- inventory ----------
+    def _inventory(self, user_id: int) -> Dict[str, int]:
+        inv = self._inv.get(int(user_id))
+        if inv is None:
+            rows = self.db.execute("SELECT item, qty FROM inventory WHERE user_id=?", (int(user_id),)).fetchall()
+            inv = self._inv[int(user_id)] = {item: int(qty) for item, qty in rows}
+        return inv
+
     def get_inventory(self, user_id: int) -> dict:
-        rows = self.db.execute("SELECT item, qty FROM inventory WHERE user_id=?", (int(user_id),)).fetchall()
-        return {item: int(qty) for item, qty in rows}
+        return dict(self._inventory(user_id))
 
+    @_locked
     def add_item(self, user_id: int, item_name: str, qty: int = 1):
         if int(qty) == 0: return
+        inv = self._inventory(user_id)  # load before writing so the cache doesn't count qty twice
         self.db.execute("""INSERT INTO inventory(user_id,item,qty) VALUES(?,?,?)
                            ON CONFLICT(user_id,item) DO UPDATE SET qty=inventory.qty+excluded.qty""",
                         (int(user_id), item_name, int(qty)))
         self.db.execute("DELETE FROM inventory WHERE user_id=? AND item=? AND qty<=0", (int(user_id), item_name))
+        left = inv.get(item_name, 0) + int(qty)
+        if left > 0: inv[item_name] = left
+        else: inv.pop(item_name, None)
 
+    @_locked
     def remove_item(self, user_id: int, item_name: str, qty: int = 1) -> bool:
-        inv = self.get_inventory(user_id)
-        have = int(inv.get(item_name, 0))
+        have = self._inventory(user_id).get(item_name, 0)
         if have < int(qty): return False
         self.add_item(user_id, item_name, -int(qty))
         return True
 
     def has_item(self, user_id: int, item_name: str, qty: int = 1) -> bool:
-        return self.get_inventory(user_id).get(item_name, 0) >= int(qty)
+        return self._inventory(user_id).get(item_name, 0) >= int(qty)
 
     # ---------- daily/work/streaks ----------
-    def get_last_daily(self, user_id: int):
+    def get_last_daily(self, user_id: int) -> Optional[int]:
         row = self.db.execute("SELECT last_iso FROM daily WHERE user_id=?", (int(user_id),)).fetchone()
-        return row[0] if row else None
+        return _to_epoch(row[0]) if row else None
 
-    def set_last_daily(self, user_id: int, iso_ts: str):
+    @_locked
+    def set_last_daily(self, user_id: int, ts: int):
+        # column keeps its old name; the value is epoch seconds
         self.db.execute("""INSERT INTO daily(user_id,last_iso) VALUES(?,?)
-                           ON CONFLICT(user_id) DO UPDATE SET last_iso=excluded.last_iso""", (int(user_id), iso_ts))
+                           ON CONFLICT(user_id) DO UPDATE SET last_iso=excluded.last_iso""", (int(user_id), int(ts)))
 
-    def get_last_work(self, user_id: int):
+    def get_last_work(self, user_id: int) -> Optional[int]:
         row = self.db.execute("SELECT last_iso FROM work WHERE user_id=?", (int(user_id),)).fetchone()
-        return row[0] if row else None
+        return _to_epoch(row[0]) if row else None
 
-    def set_last_work(self, user_id: int, iso_ts: str):
+    @_locked
+    def set_last_work(self, user_id: int, ts: int):
+        # epoch seconds, like daily
         self.db.execute("""INSERT INTO work(user_id,last_iso) VALUES(?,?)
-                           ON CONFLICT(user_id) DO UPDATE SET last_iso=excluded.last_iso""", (int(user_id), iso_ts))
+                           ON CONFLICT(user_id) DO UPDATE SET last_iso=excluded.last_iso""", (int(user_id), int(ts)))
 
     def get_streak(self, user_id: int) -> dict:
         row = self.db.execute("SELECT count,last_date FROM streaks WHERE user_id=?", (int(user_id),)).fetchone()
         return {"count": int(row[0]), "last_date": row[1]} if row else {"count": 0, "last_date": None}
 
+    @_locked
     def set_streak(self, user_id: int, count: int, last_date: str | None):
         self.db.execute("""INSERT INTO streaks(user_id,count,last_date) VALUES(?,?,?)
                            ON CONFLICT(user_id) DO UPDATE SET count=excluded.count,last_date=excluded.last_date""",
                         (int(user_id), int(count), last_date))
 
     # ---------- stats & achievements ----------
-    def add_result(self, user_id: int, result: str):
-        col = "wins" if result=="win" else ("losses" if result=="loss" else "pushes")
-        self.db.execute("""INSERT INTO stats(user_id,wins,losses,pushes) VALUES(?,0,0,0)
-                           ON CONFLICT(user_id) DO NOTHING""", (int(user_id),))
-        self.db.execute(f"UPDATE stats SET {col}={col}+1 WHERE user_id=?", (int(user_id),))
+    @_locked
+    def add_result(self, user_id: int, result: str) -> dict:
+        i = 0 if result=="win" else (1 if result=="loss" else 2)
+        col = ("wins", "losses", "pushes")[i]
+        inc = [0, 0, 0]; inc[i] = 1
+        self.db.execute(f"""INSERT INTO stats(user_id,wins,losses,pushes) VALUES(?,?,?,?)
+                            ON CONFLICT(user_id) DO UPDATE SET {col}=stats.{col}+1""", (int(user_id), *inc))
+        row = self._stats.setdefault(int(user_id), [0, 0, 0])
+        row[i] += 1
+        if i == 0: self._drop_top("wins")
+        return {"wins": row[0], "losses": row[1], "pushes": row[2]}
 
     def get_stats(self, user_id: int) -> dict:
-        row = self.db.execute("SELECT wins,losses,pushes FROM stats WHERE user_id=?", (int(user_id),)).fetchone()
-        if not row: return {"wins":0,"losses":0,"pushes":0}
-        return {"wins": int(row[0]), "losses": int(row[1]), "pushes": int(row[2])}
+        w, l, p = self._stats.get(int(user_id), (0, 0, 0))
+        return {"wins": w, "losses": l, "pushes": p}
+
+    def _drop_top(self, key: str):
+        for k in [k for k in self._top if k[0] == key]:
+            del self._top[k]
 
     def list_top(self, key: str, limit: int = 10):
+        hit = self._top.get((key, int(limit)))
+        if hit is not None:
+            return list(hit)
         if key == "balance":
             rows = self.db.execute("SELECT user_id, balance FROM wallets ORDER BY balance DESC LIMIT ?", (int(limit),)).fetchall()
-            return [(int(uid), int(bal)) for uid, bal in rows]
-        if key == "wins":
+        elif key == "wins":
             rows = self.db.execute("SELECT user_id, wins FROM stats ORDER BY wins DESC LIMIT ?", (int(limit),)).fetchall()
-            return [(int(uid), int(w)) for uid, w in rows]
-        return []
+        else:
+            return []
+        top = self._top[(key, int(limit))] = [(int(uid), int(v)) for uid, v in rows]
+        return list(top)
 
     def get_achievements(self, user_id: int) -> list[str]:
         rows = self.db.execute("SELECT name FROM achievements WHERE user_id=?", (int(user_id),)).fetchall()
         return [r[0] for r in rows]
 
+    @_locked
     def award_achievement(self, user_id: int, name: str) -> bool:
         try:
             self.db.execute("INSERT INTO achievements(user_id,name) VALUES(?,?)", (int(user_id), name))
@@ -498,6 +650,7 @@ class Store:
         row = self.db.execute("SELECT value FROM kv WHERE key='trivia_token'").fetchone()
         return row[0] if row else None
 
+    @_locked
     def set_trivia_token(self, token):
         if token is None:
             self.db.execute("DELETE FROM kv WHERE key='trivia_token'")
@@ -505,6 +658,7 @@ class Store:
             self.db.execute("INSERT OR REPLACE INTO kv(key,value) VALUES('trivia_token',?)", (token,))
 
     # ---------- weather defaults & subscriptions ----------
+    @_locked
     def set_user_zip(self, user_id: int, zip_code: str):
         self.db.execute("""INSERT INTO weather_zips(user_id,zip) VALUES(?,?)
                            ON CONFLICT(user_id) DO UPDATE SET zip=excluded.zip""", (int(user_id), str(zip_code)))
@@ -513,6 +667,7 @@ class Store:
         row = self.db.execute("SELECT zip FROM weather_zips WHERE user_id=?", (int(user_id),)).fetchone()
         return row[0] if row else None
 
+    @_locked
     def add_weather_sub(self, sub: dict) -> int:
         uid = int(sub["user_id"])
         sid = self._lowest_free_id_for_user("weather_subs", uid)
@@ -529,16 +684,27 @@ class Store:
         else:
             q = "SELECT user_id,id,zip,cadence,hh,mi,weekly_days,next_run_utc FROM weather_subs WHERE user_id=? ORDER BY id"
             rows = self.db.execute(q, (int(user_id),)).fetchall()
-        out = []
-        for uid, sid, z, cad, hh, mi, wdays, next_run in rows:
-            out.append({"user_id": int(uid), "id": int(sid), "zip": z, "cadence": cad,
-                        "hh": int(hh), "mi": int(mi), "weekly_days": int(wdays), "next_run_utc": next_run})
-        return out
-
+        return [self._weather_sub_row(r) for r in rows]
+
+    def list_due_weather_subs(self, now_utc: datetime) -> list:
+        # julianday() normalizes any stored offset (naive values count as UTC, as before);
+        # rows with no/garbled next_run are treated as due so they get rescheduled
+        q = """SELECT user_id,id,zip,cadence,hh,mi,weekly_days,next_run_utc FROM weather_subs
+               WHERE julianday(next_run_utc) IS NULL OR julianday(next_run_utc) <= julianday(?)"""
+        return [self._weather_sub_row(r) for r in self.db.execute(q, (now_utc.isoformat(),)).fetchall()]
+
+    @staticmethod
+    def _weather_sub_row(row) -> dict:
+        uid, sid, z, cad, hh, mi, wdays, next_run = row
+        return {"user_id": int(uid), "id": int(sid), "zip": z, "cadence": cad,
+                "hh": int(hh), "mi": int(mi), "weekly_days": int(wdays), "next_run_utc": next_run}
+
+    @_locked
     def remove_weather_sub(self, sid: int, requester_id: int) -> bool:
         cur = self.db.execute("DELETE FROM weather_subs WHERE user_id=? AND id=?", (int(requester_id), int(sid)))
         return cur.rowcount > 0
 
+    @_locked
     def update_weather_sub(self, sid: int, **updates):
         uid = int(updates.pop("user_id", 0)) or None
         if uid is None:
@@ -554,6 +720,7 @@ class Store:
         return True
 
     # ---------- notes ----------
+    @_locked
     def add_note(self, user_id: int, text: str) -> int:
         nid = self._lowest_free_id_for_user("notes", int(user_id))
         self.db.execute("INSERT INTO notes(user_id,id,text) VALUES(?,?,?)", (int(user_id), nid, text))
@@ -563,11 +730,13 @@ class Store:
         rows = self.db.execute("SELECT id, text FROM notes WHERE user_id=? ORDER BY id", (int(user_id),)).fetchall()
         return [(int(i), t) for i, t in rows]
 
+    @_locked
     def delete_note(self, user_id: int, note_id: int) -> bool:
         cur = self.db.execute("DELETE FROM notes WHERE user_id=? AND id=?", (int(user_id), int(note_id)))
         return cur.rowcount > 0
 
     # ---------- pins ----------
+    @_locked
     def set_pin(self, channel_id: int, text: str):
         self.db.execute("""INSERT INTO pins(channel_id,text) VALUES(?,?)
                            ON CONFLICT(channel_id) DO UPDATE SET text=excluded.text""", (int(channel_id), text))
@@ -576,10 +745,12 @@ class Store:
         row = self.db.execute("SELECT text FROM pins WHERE channel_id=?", (int(channel_id),)).fetchone()
         return row[0] if row else None
 
+    @_locked
     def clear_pin(self, channel_id: int):
         self.db.execute("DELETE FROM pins WHERE channel_id=?", (int(channel_id),))
 
     # ---------- polls ----------
+    @_locked
     def save_poll(self, message_id: int, poll: dict):
         is_open = 1 if poll.get("open", True) else 0
         if not is_open:
@@ -590,42 +761,51 @@ class Store:
             return
         self.db.execute("""INSERT INTO polls(message_id,json,is_open) VALUES(?,?,?)
                            ON CONFLICT(message_id) DO UPDATE SET json=excluded.json,is_open=excluded.is_open""",
-                        (int(message_id), json.dumps(poll), is_open))
+                        (int(message_id), _json_compact(poll), is_open))
+        self._polls[int(message_id)] = poll
 
     def get_poll(self, message_id: int):
-        row = self.db.execute("SELECT json FROM polls WHERE message_id=?", (int(message_id),)).fetchone()
-        return json.loads(row[0]) if row else None
+        # Returns the cached dict itself; callers mutate it and hand it back to save_poll
+        return self._polls.get(int(message_id))
 
+    @_locked
     def delete_poll(self, message_id: int):
         self.db.execute("DELETE FROM polls WHERE message_id=?", (int(message_id),))
+        self._polls.pop(int(message_id), None)
 
     def list_open_polls(self) -> list[tuple[int, dict]]:
-        rows = self.db.execute("SELECT message_id, json FROM polls WHERE is_open=1").fetchall()
-        return [(int(mid), json.loads(js)) for mid, js in rows]
+        return list(self._polls.items())
 
     # ---------- reminders ----------
-    def add_reminder(self, rem: dict) -> int:
-        uid = int(rem["user_id"])
-        rid = self._lowest_free_id_for_user("reminders", uid)
-        self.db.execute("""INSERT INTO reminders(user_id,id,channel_id,dm,text,due_utc)
-                           VALUES(?,?,?,?,?,?)""",
-                        (uid, rid,
-                         (None if rem.get("channel_id") in (None,"","None") else int(rem["channel_id"])),
-                         1 if rem.get("dm") else 0, str(rem.get("text","")), str(rem["due_utc"])))
+    def add_reminder(self, user_id: int, channel_id: Optional[int], dm: bool, text: str, due_ts: int) -> int:
+        due_utc = datetime.fromtimestamp(due_ts, timezone.utc).isoformat()
+        with self._lock:
+            rid = self._lowest_free_id_for_user("reminders", user_id)
+            self.db.execute("""INSERT INTO reminders(user_id,id,channel_id,dm,text,due_utc,due_ts)
+                               VALUES(?,?,?,?,?,?,?)""",
+                            (user_id, rid, channel_id, 1 if dm else 0, text, due_utc, int(due_ts)))
         return rid
 
     def list_reminders(self, user_id: int | None = None) -> list[dict]:
         if user_id is None:
-            rows = self.db.execute("SELECT user_id,id,channel_id,dm,text,due_utc FROM reminders ORDER BY user_id,id").fetchall()
+            rows = self.db.execute("SELECT user_id,id,channel_id,dm,text,due_utc,due_ts FROM reminders ORDER BY user_id,id").fetchall()
         else:
-            rows = self.db.execute("SELECT user_id,id,channel_id,dm,text,due_utc FROM reminders WHERE user_id=? ORDER BY id",
+            rows = self.db.execute("SELECT user_id,id,channel_id,dm,text,due_utc,due_ts FROM reminders WHERE user_id=? ORDER BY id",
                                    (int(user_id),)).fetchall()
-        out = []
-        for uid, rid, cid, dm, text, due in rows:
-            out.append({"user_id": int(uid), "id": int(rid), "channel_id": (None if cid is None else int(cid)),
-                        "dm": bool(dm), "text": text, "due_utc": due})
-        return out
+        return [self._reminder_row(r) for r in rows]
+
+    def list_due_reminders(self, before_ts: int, limit: int = 100) -> list[dict]:
+        rows = self.db.execute("""SELECT user_id,id,channel_id,dm,text,due_utc,due_ts FROM reminders
+                                  WHERE due_ts <= ? ORDER BY due_ts LIMIT ?""", (int(before_ts), int(limit))).fetchall()
+        return [self._reminder_row(r) for r in rows]
 
+    @staticmethod
+    def _reminder_row(row) -> dict:
+        # INTEGER columns come back as Python ints already (affinity converts numeric text on insert)
+        uid, rid, cid, dm, text, due, due_ts = row
+        return {"user_id": uid, "id": rid, "channel_id": cid, "dm": bool(dm), "text": text, "due_utc": due, "due_ts": due_ts}
+
+    @_locked
     def cancel_reminder(self, rid: int, requester_id: int, is_mod: bool) -> bool:
         # Since IDs are per-user, target by both user_id and id
         if is_mod:
@@ -635,10 +815,25 @@ class Store:
             cur = self.db.execute("DELETE FROM reminders WHERE user_id=? AND id=?", (int(requester_id), int(rid)))
             return cur.rowcount > 0
 
+    def has_due(self, before_ts: int) -> bool:
+        return self.db.execute("SELECT 1 FROM reminders WHERE due_ts <= ? LIMIT 1", (int(before_ts),)).fetchone() is not None
+
+    def list_due_times(self) -> list[int]:
+        return [int(r[0]) for r in self.db.execute("SELECT due_ts FROM reminders").fetchall()]
+
+    def cancel_reminders_bulk(self, keys: list[tuple[int, int]]) -> int:
+        # keys are (user_id, id) pairs since reminder IDs are per-user; one transaction for the lot
+        if not keys: return 0
+        with self.transaction():
+            cur = self.db.executemany("DELETE FROM reminders WHERE user_id=? AND id=?",
+                                      [(int(uid), int(rid)) for uid, rid in keys])
+        return cur.rowcount
+
     # ---------- admin allowlist ----------
     def is_allowlisted(self, user_id: int) -> bool:
         return self.db.execute("SELECT 1 FROM admin_allowlist WHERE user_id=?", (int(user_id),)).fetchone() is not None
 
+    @_locked
     def add_allowlisted(self, user_id: int) -> bool:
         try:
             self.db.execute("INSERT INTO admin_allowlist(user_id) VALUES(?)", (int(user_id),))
@@ -646,6 +841,7 @@ class Store:
         except sqlite3.IntegrityError:
             return False
 
+    @_locked
     def remove_allowlisted(self, user_id: int) -> bool:
         cur = self.db.execute("DELETE FROM admin_allowlist WHERE user_id=?", (int(user_id),))
         return cur.rowcount > 0
@@ -656,18 +852,25 @@ class Store:
 
     # ---------- autodelete ----------
     def get_autodelete(self) -> dict:
-        rows = self.db.execute("SELECT channel_id, seconds FROM autodelete").fetchall()
-        return {str(int(cid)): int(secs) for cid, secs in rows}
+        return dict(self._ad)
+
+    def get_autodelete_seconds(self, channel_id: int) -> Optional[int]:
+        return self._ad.get(int(channel_id))
 
+    @_locked
     def set_autodelete(self, channel_id: int, seconds: int):
         self.db.execute("""INSERT INTO autodelete(channel_id,seconds) VALUES(?,?)
                            ON CONFLICT(channel_id) DO UPDATE SET seconds=excluded.seconds""",
                         (int(channel_id), int(seconds)))
+        self._ad[int(channel_id)] = int(seconds)
 
+    @_locked
     def remove_autodelete(self, channel_id: int):
         self.db.execute("DELETE FROM autodelete WHERE channel_id=?", (int(channel_id),))
+        self._ad.pop(int(channel_id), None)
 
 
+    @_locked
     def set_note(self, user_id: int, key: str, text: str) -> None:
         ns_key = f"note:{int(user_id)}:{key}"
         val = "" if text is None else str(text)
@@ -683,17 +886,131 @@ class Store:
         row = self.db.execute("SELECT value FROM kv WHERE key=?", (ns_key,)).fetchone()
         return row[0] if row and row[0] is not None else ""
 
+    def get_kv(self, key: str) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM kv WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @_locked
+    def set_kv(self, key: str, value: str):
+        self.db.execute("INSERT INTO kv(key,value) VALUES(?,?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                        (key, value))
+
+    def get_notes_prefix(self, user_id: int, prefix: str) -> dict[str, str]:
+        # range scan on the kv primary key instead of one lookup per note
+        base = f"note:{int(user_id)}:"
+        lo = base + prefix
+        rows = self.db.execute("SELECT key, value FROM kv WHERE key >= ? AND key < ?",
+                               (lo, lo + "\uffff")).fetchall()
+        return {k[len(base):]: (v or "") for k, v in rows}
+
+    def list_users_with_note(self, key: str, value: str) -> list[int]:
+        rows = self.db.execute("SELECT key FROM kv WHERE key GLOB ? AND value=?", (f"note:*:{key}", value)).fetchall()
+        return [int(k.split(":", 2)[1]) for (k,) in rows]
+
+    def set_notes(self, user_id: int, items: dict[str, str]) -> None:
+        if not items:
+            return
+        uid = int(user_id)
+        with self.transaction():
+            self.db.executemany(
+                "INSERT INTO kv(key,value) VALUES(?,?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                [(f"note:{uid}:{k}", "" if v is None else str(v)) for k, v in items.items()],
+            )
+
+    def delete_notes(self, user_id: int, keys) -> None:
+        uid = int(user_id)
+        with self._lock:
+            self.db.executemany("DELETE FROM kv WHERE key=?", [(f"note:{uid}:{k}",) for k in keys])
+
 store = Store(DATA_PATH)
 
+# ---------- User lookup ----------
+# Users fetched over REST aren't kept by discord.py's cache (no shared guild), so keep them here.
+USER_CACHE_TTL = 3600
+_fetched_users: Dict[int, Tuple[float, Any]] = {}
+
+def _cached_user(uid: int):
+    u = bot.get_user(uid)
+    if u is not None:
+        return u
+    hit = _fetched_users.get(uid)
+    if hit and time.monotonic() - hit[0] < USER_CACHE_TTL:
+        return hit[1]
+    return None
+
+async def _resolve_user(uid: int):
+    # Gateway cache first; only hit the REST API for users we haven't seen.
+    uid = int(uid)
+    u = _cached_user(uid)
+    if u is None:
+        u = await bot.fetch_user(uid)
+        _fetched_users[uid] = (time.monotonic(), u)
+    return u
+
+async def _resolve_users(ids) -> dict:
+    """uid -> User for every id that resolves; cache hits cost nothing, misses are fetched in parallel."""
+    found, missing = {}, []
+    for uid in ids:
+        u = _cached_user(int(uid))
+        if u is None: missing.append(int(uid))
+        else: found[int(uid)] = u
+    if missing:
+        fetched = await asyncio.gather(*(bot.fetch_user(uid) for uid in missing), return_exceptions=True)
+        now = time.monotonic()
+        for uid, u in zip(missing, fetched):
+            if not isinstance(u, Exception):
+                found[uid] = u; _fetched_users[uid] = (now, u)
+    return found
+
+async def _resolve_channel(cid: int):
+    return bot.get_channel(int(cid)) or await bot.fetch_channel(int(cid))
+
+# ---------- Message helpers ----------
+# Background loops (reminders, weather, alerts) all DM through one shared budget, so
+# several of them firing in the same tick can't pile up unbounded sends on the gateway.
+NOTIFY_CONCURRENCY = 8
+_notify_sem = asyncio.Semaphore(NOTIFY_CONCURRENCY)
+
+async def _notify(dest, *args, **kwargs):
+    async with _notify_sem:
+        return await dest.send(*args, **kwargs)
+
+def _chunk_lines(lines: List[str], limit: int = 2000) -> List[str]:
+    """Join lines into as few messages as possible, each under Discord's length limit."""
+    chunks, cur, size = [], [], 0
+    for line in lines:
+        line = line[:limit]
+        if cur and size + 1 + len(line) > limit:
+            chunks.append("\n".join(cur)); cur, size = [], 0
+        size += len(line) + (1 if cur else 0); cur.append(line)
+    if cur: chunks.append("\n".join(cur))
+    return chunks
+
 # ---------- Permissions helper ----------
+DENY_MANAGE_MESSAGES = "You need the **Manage Messages** permission here."
+DENY_ADMIN_OR_ALLOWLIST = "You need **Administrator/Manage Server** or be on the bot's admin allowlist."
+DENY_REAL_ADMIN = "Only users with **Administrator** or **Manage Server** can manage the allowlist."
+
 def require_manage_messages():
     def predicate(inter: discord.Interaction):
         perms = inter.channel.permissions_for(inter.user) if isinstance(inter.channel, (discord.TextChannel, discord.Thread)) else None
         if not perms or not perms.manage_messages:
-            raise app_commands.CheckFailure("You need the **Manage Messages** permission here.")
+            raise app_commands.CheckFailure(DENY_MANAGE_MESSAGES)
         return True
     return app_commands.check(predicate)
 
+@tree.error
+async def on_app_command_error(inter: discord.Interaction, error: app_commands.AppCommandError):
+    # Failed permission checks get an immediate ephemeral answer instead of a timed-out interaction
+    if isinstance(error, app_commands.CheckFailure):
+        send = inter.followup.send if inter.response.is_done() else inter.response.send_message
+        try:
+            await send(str(error) or "You can't use this command here.", ephemeral=True)
+        except discord.HTTPException:
+            pass
+        return
+    traceback.print_exception(error)
+
 def _has_guild_admin_perms(inter: discord.Interaction) -> bool:
     """True if the user has Administrator or Manage Server in this channel/guild."""
     try:
@@ -712,7 +1029,7 @@ def require_admin_or_allowlisted():
     def predicate(inter: discord.Interaction):
         if _has_guild_admin_perms(inter) or store.is_allowlisted(inter.user.id):
             return True
-        raise app_commands.CheckFailure("You need **Administrator/Manage Server** or be on the bot's admin allowlist.")
+        raise app_commands.CheckFailure(DENY_ADMIN_OR_ALLOWLIST)
     return app_commands.check(predicate)
 
 def require_real_admin():
@@ -720,7 +1037,7 @@ def require_real_admin():
     def predicate(inter: discord.Interaction):
         if _has_guild_admin_perms(inter):
             return True
-        raise app_commands.CheckFailure("Only users with **Administrator** or **Manage Server** can manage the allowlist.")
+        raise app_commands.CheckFailure(DENY_REAL_ADMIN)
     return app_commands.check(predicate)
 
 
@@ -728,15 +1045,84 @@ def require_real_admin():
 SUITS = ["♠", "♥", "♦", "♣"]
 RANKS = ["A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K"]
 VALUES = {**{str(i): i for i in range(2, 11)}, "J": 10, "Q": 10, "K": 10, "A": 11}
+# Same values indexed by ord(rank[0]) ("10" is the only rank starting with "1"): list index, no hashing
+_RANK_VALUE = [0] * 128
+for _r, _v in VALUES.items():
+    _RANK_VALUE[ord(_r[0])] = _v
+del _r, _v
+_DECK_TEMPLATE: Tuple[Tuple[str, str], ...] = tuple((r, s) for s in SUITS for r in RANKS)
+
+# Games draw from their own generator (seeded once from the OS entropy pool)
+# instead of the shared module-level `random` state; a game may .set() its own.
+_game_rng: contextvars.ContextVar[random.Random] = contextvars.ContextVar(
+    "game_rng", default=random.Random(secrets.randbits(64))
+)
 
 def deal_deck():
-    deck = [(r, s) for s in SUITS for r in RANKS]
+    deck = list(_DECK_TEMPLATE)
     random.shuffle(deck)
     return deck
 
+def draw_cards(k: int) -> List[Tuple[str, str]]:
+    # For games that only ever use a few cards: k distinct cards without shuffling all 52
+    return random.sample(_DECK_TEMPLATE, k)
+
+class DeckPool:
+    """A few pre-shuffled decks kept ready so starting a game doesn't pay for the shuffle."""
+    def __init__(self, size: int = 4):
+        self.size = size
+        self._decks = deque(deal_deck() for _ in range(size))
+        self._refill_scheduled = False
+
+    def pop(self) -> List[Tuple[str, str]]:
+        deck = self._decks.popleft() if self._decks else deal_deck()
+        if not self._refill_scheduled:
+            try:
+                # Top the pool back up after the caller's turn on the loop, not during it.
+                asyncio.get_running_loop().call_soon(self._refill)
+                self._refill_scheduled = True
+            except RuntimeError:
+                self._refill()
+        return deck
+
+    def _refill(self):
+        self._refill_scheduled = False
+        while len(self._decks) < self.size:
+            self._decks.append(deal_deck())
+
+deck_pool = DeckPool()
+
+class Hand(list):
+    """A list of cards that keeps its blackjack total current as cards are appended."""
+    __slots__ = ("_hard", "_aces")
+
+    def __init__(self, cards=()):
+        super().__init__()
+        self._hard = self._aces = 0
+        for c in cards:
+            self.append(c)
+
+    def append(self, card: Tuple[str, str]):
+        super().append(card)
+        self._hard += _RANK_VALUE[ord(card[0][0])]
+        if card[0] == "A": self._aces += 1
+
+    @property
+    def value(self) -> int:
+        total, aces = self._hard, self._aces
+        while total > 21 and aces:
+            total -= 10
+            aces -= 1
+        return total
+
 def hand_value(cards: List[Tuple[str, str]]) -> int:
-    total = sum(VALUES[r] for r, _ in cards)
-    aces = sum(1 for r, _ in cards if r == "A")
+    if isinstance(cards, Hand):
+        return cards.value
+    total = aces = 0
+    val = _RANK_VALUE
+    for r, _ in cards:
+        total += val[ord(r[0])]
+        if r == "A": aces += 1
     while total > 21 and aces:
         total -= 10
         aces -= 1
@@ -771,21 +1157,19 @@ def _update_streak(user_id: int) -> int:
 
 @tree.command(name="daily", description="Claim your daily free credits (with streak bonus).")
 async def daily(inter: discord.Interaction):
-    now = datetime.now(timezone.utc)
-    last_iso = store.get_last_daily(inter.user.id)
-    if last_iso:
-        last = datetime.fromisoformat(last_iso)
-        if now - last < timedelta(hours=20):
-            remaining = timedelta(hours=20) - (now - last)
-            hrs = int(remaining.total_seconds() // 3600)
-            mins = int((remaining.total_seconds() % 3600) // 60)
-            return await inter.response.send_message(f"⏳ You already claimed. Try again in **{hrs}h {mins}m**.", ephemeral=True)
+    now_ts = int(time.time())
+    last = store.get_last_daily(inter.user.id)
+    if last is not None:
+        remaining = DAILY_COOLDOWN_HOURS * 3600 - (now_ts - last)
+        if remaining > 0:
+            hrs, rem = divmod(remaining, 3600)
+            return await inter.response.send_message(f"⏳ You already claimed. Try again in **{hrs}h {rem // 60}m**.", ephemeral=True)
     amount = STARTING_DAILY
     streak = _update_streak(inter.user.id)
     bonus = min(STREAK_STEP * max(0, streak - 1), STREAK_MAX_BONUS)
     amount += bonus
     store.add_balance(inter.user.id, amount)
-    store.set_last_daily(inter.user.id, now.isoformat())
+    store.set_last_daily(inter.user.id, now_ts)
     emb = discord.Embed(title="✅ Daily Claimed")
     emb.add_field(name="Base", value=str(STARTING_DAILY), inline=True)
     emb.add_field(name="Streak Bonus", value=f"+{bonus} (Streak: {streak}🔥)", inline=True)
@@ -794,19 +1178,16 @@ async def daily(inter: discord.Interaction):
 
 @tree.command(name="work", description="Work a quick virtual job for credits (1h cooldown).")
 async def work(inter: discord.Interaction):
-    now = datetime.now(timezone.utc)
-    last_iso = store.get_last_work(inter.user.id)
-    if last_iso:
-        last = datetime.fromisoformat(last_iso)
-        cd = timedelta(minutes=WORK_COOLDOWN_MINUTES)
-        if now - last < cd:
-            remaining = cd - (now - last)
-            m = int(remaining.total_seconds() // 60)
-            s = int(remaining.total_seconds() % 60)
+    now_ts = int(time.time())
+    last = store.get_last_work(inter.user.id)
+    if last is not None:
+        remaining = WORK_COOLDOWN_MINUTES * 60 - (now_ts - last)
+        if remaining > 0:
+            m, s = divmod(remaining, 60)
             return await inter.response.send_message(f"⏳ You’re tired. Try again in **{m}m {s}s**.", ephemeral=True)
     amount = random.randint(WORK_MIN_PAY, WORK_MAX_PAY)
     store.add_balance(inter.user.id, amount)
-    store.set_last_work(inter.user.id, now.isoformat())
+    store.set_last_work(inter.user.id, now_ts)
     job = random.choice(["bug squash", "barge fueling", "code review", "data entry", "ticket triage", "river nav calc", "crate stacking"])
     await inter.response.send_message(f"💼 You did a **{job}** shift and earned **{amount}** credits!")
 
@@ -815,33 +1196,29 @@ async def work(inter: discord.Interaction):
 async def pay(inter: discord.Interaction, user: discord.User, amount: app_commands.Range[int, 1, 10_000_000]):
     if user.id == inter.user.id or user.bot:
         return await inter.response.send_message("Pick a real recipient.", ephemeral=True)
-    bal = store.get_balance(inter.user.id)
-    if bal < amount:
+    with store.transaction():
+        sent = store.try_debit(inter.user.id, amount) is not None
+        if sent: store.add_balance(user.id, amount)
+    if not sent:
         return await inter.response.send_message("❌ You don't have that many credits.", ephemeral=True)
-    store.add_balance(inter.user.id, -amount)
-    store.add_balance(user.id, amount)
     await inter.response.send_message(f"✅ Sent **{amount}** credits to **{user.display_name}**.")
 
 @tree.command(name="cooldowns", description="See your time left for daily and work.")
 async def cooldowns(inter: discord.Interaction):
-    now = datetime.now(timezone.utc)
+    now_ts = int(time.time())
     daily_left = "Ready ✅"
-    last_iso = store.get_last_daily(inter.user.id)
-    if last_iso:
-        last = datetime.fromisoformat(last_iso)
-        cd = timedelta(hours=20) - (now - last)
-        if cd.total_seconds() > 0:
-            h = int(cd.total_seconds() // 3600)
-            m = int((cd.total_seconds() % 3600) // 60)
-            daily_left = f"{h}h {m}m"
+    last = store.get_last_daily(inter.user.id)
+    if last is not None:
+        cd = DAILY_COOLDOWN_HOURS * 3600 - (now_ts - last)
+        if cd > 0:
+            h, rem = divmod(cd, 3600)
+            daily_left = f"{h}h {rem // 60}m"
     work_left = "Ready ✅"
-    wlast_iso = store.get_last_work(inter.user.id)
-    if wlast_iso:
-        wlast = datetime.fromisoformat(wlast_iso)
-        wcd = timedelta(minutes=WORK_COOLDOWN_MINUTES) - (now - wlast)
-        if wcd.total_seconds() > 0:
-            mm = int(wcd.total_seconds() // 60)
-            ss = int(wcd.total_seconds() % 60)
+    wlast = store.get_last_work(inter.user.id)
+    if wlast is not None:
+        wcd = WORK_COOLDOWN_MINUTES * 60 - (now_ts - wlast)
+        if wcd > 0:
+            mm, ss = divmod(wcd, 60)
             work_left = f"{mm}m {ss}s"
     emb = discord.Embed(title="⏱️ Cooldowns")
     emb.add_field(name="Daily", value=daily_left, inline=True)
@@ -876,19 +1253,16 @@ async def weather_cmd(inter: discord.Interaction, zip: Optional[str] = None):
             )
         z = str(saved)
     else:
-        z = re.sub(r"[^0-9]", "", str(zip))
+        z = _NON_DIGITS_RE.sub("", str(zip))
         if len(z) != 5:
             return await inter.followup.send("Please give a valid 5‑digit US ZIP.", ephemeral=True)
     try:
         async with aiohttp.ClientSession(headers=HTTP_HEADERS) as session:
             # 1) ZIP -> lat/lon
-            async with session.get(f"https://api.zippopotam.us/us/{z}", timeout=aiohttp.ClientTimeout(total=12)) as r:
-                if r.status != 200:
-                    return await inter.followup.send("Couldn't look up that ZIP.", ephemeral=True)
-                zp = await r.json()
-            place = zp["places"][0]
-            lat = float(place["latitude"]); lon = float(place["longitude"])
-            city = place["place name"]; state = place["state abbreviation"]
+            try:
+                city, state, lat, lon = await _zip_to_place_and_coords(session, z)
+            except RuntimeError:
+                return await inter.followup.send("Couldn't look up that ZIP.", ephemeral=True)
 
             # 2) Weather: current + today's daily (for sunrise/sunset/uv and description)
             params = {
@@ -966,7 +1340,13 @@ def _next_local_run(now_local: datetime, hh: int, mi: int, cadence: str) -> date
         target += timedelta(days=1 if cadence == "daily" else 7)
     return target
 
+# ZIP -> (city, state, lat, lon); geocodes don't change, so successful lookups are kept for the process lifetime
+_zip_cache: Dict[str, Tuple[str, str, float, float]] = {}
+
 async def _zip_to_place_and_coords(session: aiohttp.ClientSession, zip_code: str):
+    hit = _zip_cache.get(zip_code)
+    if hit is not None:
+        return hit
     async with session.get(f"https://api.zippopotam.us/us/{zip_code}", timeout=aiohttp.ClientTimeout(total=12)) as r:
         if r.status != 200:
             raise RuntimeError("Invalid ZIP or lookup failed.")
@@ -974,6 +1354,7 @@ async def _zip_to_place_and_coords(session: aiohttp.ClientSession, zip_code: str
     place = zp["places"][0]
     city = place["place name"]; state = place["state abbreviation"]
     lat = float(place["latitude"]); lon = float(place["longitude"])
+    _zip_cache[zip_code] = (city, state, lat, lon)
     return city, state, lat, lon
 
 
@@ -1026,8 +1407,8 @@ async def _fetch_outlook(session: aiohttp.ClientSession, lat: float, lon: float,
         line = f"{icon} {desc} — " + " - ".join(parts)
         out.append((d, line, sunrise, sunset, uv, hi))
     return out
-def _fmt_local(dt_utc: datetime):
-    return dt_utc.astimezone(_chicago_tz_for(datetime.now())).strftime("%m-%d-%Y %H:%M %Z")
+def _fmt_local(dt_utc: datetime, tz=None):
+    return dt_utc.astimezone(tz or _chicago_tz_for(datetime.now())).strftime("%m-%d-%Y %H:%M %Z")
 
 CADENCE_CHOICES = [
     app_commands.Choice(name="daily", value="daily"),
@@ -1036,7 +1417,7 @@ CADENCE_CHOICES = [
 
 @tree.command(name="weather_set_zip", description="Set your default ZIP code for weather features.")
 async def weather_set_zip(inter: discord.Interaction, zip: app_commands.Range[str, 5, 10]):
-    z = re.sub(r"[^0-9]", "", zip)
+    z = _NON_DIGITS_RE.sub("", zip)
     if len(z) != 5:
         return await inter.response.send_message("Please provide a valid 5‑digit US ZIP.", ephemeral=True)
     store.set_user_zip(inter.user.id, z)
@@ -1060,7 +1441,7 @@ async def weather_subscribe(
     await inter.response.defer(ephemeral=True)
     try:
         hh, mi = _parse_time(time)
-        z = re.sub(r"[^0-9]", "", zip) if zip else (store.get_user_zip(inter.user.id) or "")
+        z = _NON_DIGITS_RE.sub("", zip) if zip else (store.get_user_zip(inter.user.id) or "")
         if len(z) != 5:
             return await inter.followup.send("Set a ZIP with `/weather_set_zip` or provide it here.", ephemeral=True)
         now_local = datetime.now(_chicago_tz_for(datetime.now()))
@@ -1092,8 +1473,10 @@ async def weather_subscriptions(inter: discord.Interaction):
         return await inter.followup.send("You have no weather subscriptions.", ephemeral=True)
 
     out_lines = []
+    # clock and zone are read once for the whole listing, not per subscription
     tz = _chicago_tz_for(datetime.now())
-    now_local = datetime.now(tz)
+    now_utc = datetime.now(timezone.utc)
+    now_local = now_utc.astimezone(tz)
 
     for s in items:
         hh = int(s.get("hh", 8))
@@ -1107,20 +1490,21 @@ async def weather_subscriptions(inter: discord.Interaction):
             needs = True
         else:
             try:
-                nxt = datetime.fromisoformat(str(raw)).replace(tzinfo=timezone.utc)
+                nxt = datetime.fromisoformat(str(raw))
+                if nxt.tzinfo is None: nxt = nxt.replace(tzinfo=timezone.utc)
             except Exception:
                 needs = True
 
-        if not needs and nxt is not None and nxt <= datetime.now(timezone.utc):
+        if not needs and nxt is not None and nxt <= now_utc:
             needs = True
 
         if needs:
             first_local = _next_local_run(now_local, hh, mi, cadence)
             nxt = first_local.astimezone(timezone.utc)
-            store.update_weather_sub(s["id"], next_run_utc=nxt.isoformat())
+            store.update_weather_sub(s["id"], user_id=inter.user.id, next_run_utc=nxt.isoformat())
 
         out_lines.append(
-            f"**#{s['id']}** — {cadence} at {hh:02d}:{mi:02d} CT - ZIP {s.get('zip','?????')} - next: {_fmt_local(nxt)}"
+            f"**#{s['id']}** — {cadence} at {hh:02d}:{mi:02d} CT - ZIP {s.get('zip','?????')} - next: {_fmt_local(nxt, tz)}"
         )
 
     await inter.followup.send("\n".join(out_lines), ephemeral=True)
@@ -1132,69 +1516,80 @@ async def weather_unsubscribe(inter: discord.Interaction, sub_id: int):
     await inter.followup.send("Removed." if ok else "Couldn't remove that ID.", ephemeral=True)
 
 
+WEATHER_SEND_CONCURRENCY = 10  # scheduled forecasts delivered in parallel per tick
+
+def _shared_outlook(outlooks: dict, session: aiohttp.ClientSession, lat: float, lon: float, days: int):
+    # Subscribers due in the same tick for the same place share one forecast request
+    key = (lat, lon, days)
+    fut = outlooks.get(key)
+    if fut is None:
+        fut = outlooks[key] = asyncio.ensure_future(_fetch_outlook(session, lat, lon, days=days))
+    return fut
+
+async def _send_weather_sub(session: aiohttp.ClientSession, s: dict, now_utc: datetime, now_local: datetime, outlooks: dict):
+    try:
+        user = await _resolve_user(s["user_id"])
+        city, state, lat, lon = await _zip_to_place_and_coords(session, s["zip"])
+        if s["cadence"] == "daily":
+            outlook = await _shared_outlook(outlooks, session, lat, lon, 2)
+            # Outlook is list of tuples: (date, line, sunrise, sunset, uv, hi)
+            title_icon = wx_icon_desc(0)[0]
+            first_hi = outlook[0][5] if outlook and outlook[0][5] is not None else None
+            emb = discord.Embed(
+                title=f"🌤️ Daily Outlook — {city}, {state} {s['zip']}",
+                colour=wx_color_from_temp_f(first_hi if first_hi is not None else 70)
+            )
+            for (d, line, sunrise, sunset, uv, _hi) in outlook:
+                # Include sunrise/sunset + UV for "daily" cadence
+                extras = []
+                if sunrise: extras.append(f"🌅 {fmt_sun(sunrise)}")
+                if sunset: extras.append(f"🌇 {fmt_sun(sunset)}")
+                if uv is not None: extras.append(f"🔆 UV {round(uv,1)}")
+                value = "\n".join([line, " - ".join(extras)]) if extras else line
+                emb.add_field(name=d, value=value, inline=False)
+            emb.set_footer(text="Chicago time schedule")
+            await _notify(user, embed=emb)
+            # schedule next
+            next_local = now_local.replace(hour=s["hh"], minute=s["mi"], second=0, microsecond=0)
+            if next_local <= now_local:
+                next_local += timedelta(days=1)
+            store.update_weather_sub(s["id"], user_id=int(s["user_id"]), next_run_utc=next_local.astimezone(timezone.utc).isoformat())
+        else:
+            days = int(s.get("weekly_days", 7))
+            days = 10 if days > 10 else (3 if days < 3 else days)
+            outlook = await _shared_outlook(outlooks, session, lat, lon, days)
+            first_hi = outlook[0][5] if outlook and outlook[0][5] is not None else None
+            emb = discord.Embed(
+                title=f"🗓️ Weekly Outlook ({days} days) — {city}, {state} {s['zip']}",
+                colour=wx_color_from_temp_f(first_hi if first_hi is not None else 70)
+            )
+            for (d, line, _sunrise, _sunset, _uv, _hi) in outlook:
+                emb.add_field(name=d, value=line, inline=False)
+            emb.set_footer(text="Chicago time schedule")
+            await _notify(user, embed=emb)
+            # schedule next week
+            next_local = now_local.replace(hour=s["hh"], minute=s["mi"], second=0, microsecond=0) + timedelta(days=7)
+            store.update_weather_sub(s["id"], user_id=int(s["user_id"]), next_run_utc=next_local.astimezone(timezone.utc).isoformat())
+    except Exception:
+        fallback = now_utc + timedelta(minutes=5)
+        store.update_weather_sub(s["id"], user_id=int(s["user_id"]), next_run_utc=fallback.isoformat())
+
 @tasks.loop(seconds=60)
 async def weather_scheduler():
     try:
         now_utc = datetime.now(timezone.utc)
-        subs = store.list_weather_subs(None)
-        if not subs:
+        due_subs = store.list_due_weather_subs(now_utc)
+        if not due_subs:
             return
+        # one clock/timezone read per tick, shared by every delivery
+        now_local = now_utc.astimezone(_chicago_tz_for(datetime.now()))
+        sem = asyncio.Semaphore(WEATHER_SEND_CONCURRENCY)
+        outlooks: dict = {}
         async with aiohttp.ClientSession(headers=HTTP_HEADERS) as session:
-            for s in subs:
-                due = datetime.fromisoformat(s["next_run_utc"]).replace(tzinfo=timezone.utc)
-                if due <= now_utc:
-                    try:
-                        user = await bot.fetch_user(int(s["user_id"]))
-                        city, state, lat, lon = await _zip_to_place_and_coords(session, s["zip"])
-                        if s["cadence"] == "daily":
-                            outlook = await _fetch_outlook(session, lat, lon, days=2)
-                            # Outlook is list of tuples: (date, line, sunrise, sunset, uv, hi)
-                            title_icon = wx_icon_desc(0)[0]
-                            first_hi = outlook[0][5] if outlook and outlook[0][5] is not None else None
-                            emb = discord.Embed(
-                                title=f"🌤️ Daily Outlook — {city}, {state} {s['zip']}",
-                                colour=wx_color_from_temp_f(first_hi if first_hi is not None else 70)
-                            )
-                            for (d, line, sunrise, sunset, uv, _hi) in outlook:
-                                # Include sunrise/sunset + UV for "daily" cadence
-                                extras = []
-                                if sunrise: extras.append(f"🌅 {fmt_sun(sunrise)}")
-                                if sunset: extras.append(f"🌇 {fmt_sun(sunset)}")
-                                if uv is not None: extras.append(f"🔆 UV {round(uv,1)}")
-                                value = "\n".join([line, " - ".join(extras)]) if extras else line
-                                emb.add_field(name=d, value=value, inline=False)
-                            emb.set_footer(text="Chicago time schedule")
-                            await user.send(embed=emb)
-                            # schedule next
-                            next_local = datetime.now(_chicago_tz_for(datetime.now()))
-                            next_local = next_local.replace(hour=s["hh"], minute=s["mi"], second=0, microsecond=0)
-                            if next_local <= datetime.now(_chicago_tz_for(datetime.now())):
-                                next_local += timedelta(days=1)
-                            store.update_weather_sub(s["id"], user_id=int(s["user_id"]), next_run_utc=next_local.astimezone(timezone.utc).isoformat())
-                        else:
-                            days = int(s.get("weekly_days", 7))
-                            days = 10 if days > 10 else (3 if days < 3 else days)
-                            outlook = await _fetch_outlook(session, lat, lon, days=days)
-                            first_hi = outlook[0][5] if outlook and outlook[0][5] is not None else None
-                            emb = discord.Embed(
-                                title=f"🗓️ Weekly Outlook ({days} days) — {city}, {state} {s['zip']}",
-                                colour=wx_color_from_temp_f(first_hi if first_hi is not None else 70)
-                            )
-                            for (d, line, _sunrise, _sunset, _uv, _hi) in outlook:
-                                emb.add_field(name=d, value=line, inline=False)
-                            emb.set_footer(text="Chicago time schedule")
-                            await user.send(embed=emb)
-                            # schedule next week
-                            next_local = datetime.now(_chicago_tz_for(datetime.now()))
-                            next_local = next_local.replace(hour=s["hh"], minute=s["mi"], second=0, microsecond=0)
-                            if next_local <= datetime.now(_chicago_tz_for(datetime.now())):
-                                next_local += timedelta(days=7)
-                            else:
-                                next_local += timedelta(days=7)
-                            store.update_weather_sub(s["id"], user_id=int(s["user_id"]), next_run_utc=next_local.astimezone(timezone.utc).isoformat())
-                    except Exception:
-                        fallback = now_utc + timedelta(minutes=5)
-                        store.update_weather_sub(s["id"], next_run_utc=fallback.isoformat())
+            async def _one(s: dict):
+                async with sem:
+                    await _send_weather_sub(session, s, now_utc, now_local, outlooks)
+            await asyncio.gather(*(_one(s) for s in due_subs), return_exceptions=True)
     except Exception:
         pass
 
@@ -1234,7 +1629,7 @@ async def wx_alerts(inter: discord.Interaction,
         return await inter.response.send_message("🔕 Severe weather alerts disabled.", ephemeral=True)
 
     # Enable
-    z = re.sub(r"[^0-9]", "", zip) if zip else (store.get_user_zip(inter.user.id) or "")
+    z = _NON_DIGITS_RE.sub("", zip) if zip else (store.get_user_zip(inter.user.id) or "")
     if len(z) != 5:
         return await inter.response.send_message("Set a ZIP with `/weather_set_zip` or provide it here.", ephemeral=True)
 
@@ -1242,9 +1637,7 @@ async def wx_alerts(inter: discord.Interaction,
     if sev not in ("advisory", "watch", "warning"):
         sev = "watch"
 
-    store.set_note(inter.user.id, "wx_alerts_enabled", "1")
-    store.set_note(inter.user.id, "wx_alerts_zip", z)
-    store.set_note(inter.user.id, "wx_alerts_min_sev", sev)
+    store.set_notes(inter.user.id, {"wx_alerts_enabled": "1", "wx_alerts_zip": z, "wx_alerts_min_sev": sev})
     await inter.response.send_message(f"🔔 Alerts **ON** for **{z}** (min severity: **{sev}**).", ephemeral=True)
 
 
@@ -1281,87 +1674,118 @@ async def _fetch_nws_alerts(session: aiohttp.ClientSession, lat: float, lon: flo
     return out
 
 
-@tasks.loop(seconds=300)  # every 5 minutes
-async def wx_alerts_scheduler():
+def _wx_alert_prefs(uid: int) -> Optional[Tuple[str, str]]:
+    """(zip, min_sev) if this user has alerts on with a usable ZIP."""
+    # enabled/zip/min_sev come back from a single kv range read
+    prefs = store.get_notes_prefix(uid, "wx_alerts_")
+    if prefs.get("wx_alerts_enabled") != "1":
+        return None
+    z = prefs.get("wx_alerts_zip") or (store.get_user_zip(uid) or "")
+    if len(z) != 5:
+        return None
+    return z, prefs.get("wx_alerts_min_sev") or "watch"
+
+async def _wx_alerts_for_user(uid: int, min_sev: str, title: str, alerts: list):
     try:
-        # Build a candidate user set from subs and stored zips
-        user_ids = set()
-        try:
-            for s in store.list_weather_subs(None):
-                user_ids.add(int(s.get("user_id")))
-        except Exception:
-            pass
+        min_rank = SEVERITY_ORDER.get(min_sev, 1)
+
+        # one range read for everything already delivered to this user
+        seen = set(store.get_notes_prefix(uid, _seen_key(uid, "")))
+        # alert ids never come back once expired, so keep only the active ones
+        # (callers skip empty fetches, which may just be a failed request)
+        active = {_seen_key(uid, a["id"]) for a in alerts if a.get("id")}
+        stale = seen - active
+        if stale:
+            await asyncio.to_thread(store.delete_notes, uid, stale)
+            seen -= stale
+
+        fresh = []
+        for a in alerts:
+            rank = NWS_SEV_MAP.get(a.get("severity",""), 0)
+            if rank < min_rank:
+                continue
+            aid = a.get("id") or ""
+            if not aid:
+                continue
+            if _seen_key(uid, aid) in seen:
+                continue
+            fresh.append(a)
+
+        if not fresh:
+            return
+
+        emb = discord.Embed(title=title, colour=discord.Colour.orange())
+        for a in fresh[:10]:
+            name, value = a["field"]
+            emb.add_field(name=name, value=value, inline=False)
+
         try:
-            rows = store.db.execute("SELECT user_id FROM weather_zips").fetchall()
-            user_ids |= {int(r[0]) for r in rows}
+            user = await _resolve_user(uid)
+            await _notify(user, embed=emb)
         except Exception:
-            pass
-        if not user_ids:
-            return
+            pass  # best-effort
 
-        async with aiohttp.ClientSession(headers=HTTP_HEADERS) as session:
-            for uid in user_ids:
-                if store.get_note(uid, "wx_alerts_enabled") != "1":
-                    continue
-                z = store.get_note(uid, "wx_alerts_zip") or (store.get_user_zip(uid) or "")
-                if len(z) != 5:
-                    continue
+        # mark seen (batch commit runs off the event loop, like reminder inserts)
+        await asyncio.to_thread(store.set_notes, uid, {_seen_key(uid, a["id"]): "1" for a in fresh})
 
-                try:
-                    city, state, lat, lon = await _zip_to_place_and_coords(session, z)
-                    alerts = await _fetch_nws_alerts(session, lat, lon)
-                    min_sev = store.get_note(uid, "wx_alerts_min_sev") or "watch"
-                    min_rank = SEVERITY_ORDER.get(min_sev, 1)
-
-                    fresh = []
-                    for a in alerts:
-                        rank = NWS_SEV_MAP.get(a.get("severity",""), 0)
-                        if rank < min_rank:
-                            continue
-                        aid = a.get("id") or ""
-                        if not aid:
-                            continue
-                        if store.get_note(uid, _seen_key(uid, aid)):
-                            continue
-                        fresh.append(a)
-
-                    if not fresh:
-                        continue
-
-                    emb = discord.Embed(
-                        title=f"⚠️ Weather Alerts — {city}, {state} {z}",
-                        colour=discord.Colour.orange()
-                    )
-                    for a in fresh[:10]:
-                        name = f"{a.get('event') or 'Alert'} ({(a.get('severity') or '').title()})"
-                        when = ""
-                        if a.get("starts"):
-                            when += f"Starts: {a['starts']}\n"
-                        if a.get("ends"):
-                            when += f"Ends: {a['ends']}\n"
-                        body = (a.get("headline") or a.get("desc") or "Details unavailable").strip()
-                        if len(body) > 400:
-                            body = body[:397] + "…"
-                        tail = f"\n{when}Source: {a.get('sender') or 'NWS'}"
-                        if a.get("link"):
-                            tail += f"\nMore: {a['link']}"
-                        emb.add_field(name=name, value=f"{body}{tail}", inline=False)
+    except Exception:
+        # soft-fail per user
+        return
 
-                    try:
-                        user = await bot.fetch_user(uid)
-                        await user.send(embed=emb)
-                    except Exception:
-                        pass  # best-effort
+def _wx_alert_field(a: dict) -> Tuple[str, str]:
+    name = f"{a.get('event') or 'Alert'} ({(a.get('severity') or '').title()})"
+    when = ""
+    if a.get("starts"):
+        when += f"Starts: {a['starts']}\n"
+    if a.get("ends"):
+        when += f"Ends: {a['ends']}\n"
+    body = (a.get("headline") or a.get("desc") or "Details unavailable").strip()
+    if len(body) > 400:
+        body = body[:397] + "…"
+    tail = f"\n{when}Source: {a.get('sender') or 'NWS'}"
+    if a.get("link"):
+        tail += f"\nMore: {a['link']}"
+    return name, f"{body}{tail}"
+
+async def _wx_alerts_for_zip(session: aiohttp.ClientSession, z: str, users: List[Tuple[int, str]]):
+    # one ZIP lookup + NWS fetch shared by everyone watching this ZIP
+    try:
+        city, state, lat, lon = await _zip_to_place_and_coords(session, z)
+        alerts = await _fetch_nws_alerts(session, lat, lon)
+    except Exception:
+        return
+    if not alerts:
+        return
+    # embed text is the same for every recipient, so format it once per ZIP
+    title = f"⚠️ Weather Alerts — {city}, {state} {z}"
+    for a in alerts:
+        a["field"] = _wx_alert_field(a)
+    await asyncio.gather(*(_wx_alerts_for_user(uid, min_sev, title, alerts) for uid, min_sev in users))
 
-                    # mark seen
-                    for a in fresh:
-                        aid = a.get("id")
-                        if aid:
-                            store.set_note(uid, _seen_key(uid, aid), "1")
+WX_ALERTS_CONCURRENCY = 10  # ZIPs checked in parallel per pass
 
-                except Exception:
-                    # soft-fail per user
-                    continue
+@tasks.loop(seconds=300)  # every 5 minutes
+async def wx_alerts_scheduler():
+    try:
+        # Only users who turned alerts on; everyone else is skipped without a per-user read
+        user_ids = store.list_users_with_note("wx_alerts_enabled", "1")
+        if not user_ids:
+            return
+
+        by_zip: Dict[str, List[Tuple[int, str]]] = {}
+        for uid in user_ids:
+            pref = _wx_alert_prefs(uid)
+            if pref:
+                by_zip.setdefault(pref[0], []).append((uid, pref[1]))
+        if not by_zip:
+            return
+
+        sem = asyncio.Semaphore(WX_ALERTS_CONCURRENCY)
+        async with aiohttp.ClientSession(headers=HTTP_HEADERS) as session:
+            async def _one(z: str, users: List[Tuple[int, str]]):
+                async with sem:
+                    await _wx_alerts_for_zip(session, z, users)
+            await asyncio.gather(*(_one(z, users) for z, users in by_zip.items()), return_exceptions=True)
     except Exception:
         # never crash the loop
         pass
@@ -1372,14 +1796,17 @@ async def before_wx_alerts():
 
 
 # ---------- NEW: Shop / Inventory / Fishing ----------
+# lowercase name -> catalog key, built once (the catalog is static)
+_CATALOG_BY_LOWER: Dict[str, str] = {k.lower(): k for k in SHOP_CATALOG}
+
 def _find_catalog_item(name: str) -> Optional[str]:
     # case-insensitive name match
     name_norm = name.strip().lower()
-    for k in SHOP_CATALOG.keys():
-        if k.lower() == name_norm:
-            return k
+    key = _CATALOG_BY_LOWER.get(name_norm)
+    if key is not None:
+        return key
     # partial match convenience
-    matches = [k for k in SHOP_CATALOG if name_norm in k.lower()]
+    matches = [k for low, k in _CATALOG_BY_LOWER.items() if name_norm in low]
     return matches[0] if len(matches) == 1 else None
 
 # ========= Reaction Shop UI =========
@@ -1392,16 +1819,16 @@ CTRL_PLUS = "➕"
 CTRL_MINUS= "➖"
 CTRL_OK   = "✅"
 CTRL_CANCEL="❌"
+SHOP_CTRLS = (CTRL_PREV, CTRL_NEXT, CTRL_BUY, CTRL_SELL, CTRL_MINUS, CTRL_PLUS, CTRL_OK, CTRL_CANCEL)
+# built once: the reaction check runs for every reaction the bot sees while a shop is open
+_NUM_INDEX = {em: i for i, em in enumerate(NUMS)}
+_SHOP_EMOJIS = frozenset(NUMS) | frozenset(SHOP_CTRLS)
 
+@functools.lru_cache(maxsize=1)
 def _shop_pages():
-    items = list(SHOP_CATALOG.items())
-    page, pages = [], []
-    for i, pair in enumerate(items, 1):
-        page.append(pair)
-        if len(page) == 9 or i == len(items):
-            pages.append(page)
-            page = []
-    return pages
+    # catalog is static, so paginate once; every reaction re-renders from this
+    items = tuple(SHOP_CATALOG.items())
+    return tuple(items[i:i + 9] for i in range(0, len(items), 9))
 
 def _shop_embed(user: discord.User, page_idx: int, mode: str, sel_idx: int, qty: int) -> discord.Embed:
     pages = _shop_pages()
@@ -1453,7 +1880,7 @@ async def shop_cmd(inter: discord.Interaction):
     for em in NUMS[:len(pages[page_idx])]:
         try: await msg.add_reaction(em)
         except discord.HTTPException: pass
-    for em in [CTRL_PREV, CTRL_NEXT, CTRL_BUY, CTRL_SELL, CTRL_MINUS, CTRL_PLUS, CTRL_OK, CTRL_CANCEL]:
+    for em in SHOP_CTRLS:
         try: await msg.add_reaction(em)
         except discord.HTTPException: pass
 
@@ -1461,7 +1888,7 @@ async def shop_cmd(inter: discord.Interaction):
         return (
             reactor.id == user.id and
             reaction.message.id == msg.id and
-            str(reaction.emoji) in NUMS + [CTRL_PREV, CTRL_NEXT, CTRL_BUY, CTRL_SELL, CTRL_MINUS, CTRL_PLUS, CTRL_OK, CTRL_CANCEL]
+            str(reaction.emoji) in _SHOP_EMOJIS
         )
 
     try:
@@ -1479,8 +1906,8 @@ async def shop_cmd(inter: discord.Interaction):
             except Exception:
                 pass
 
-            if emoji in NUMS:
-                idx = NUMS.index(emoji)
+            idx = _NUM_INDEX.get(emoji)
+            if idx is not None:
                 if idx < len(pages[page_idx]):
                     sel_idx = idx
 
@@ -1515,11 +1942,9 @@ async def shop_cmd(inter: discord.Interaction):
                         await inter.followup.send("That item cannot be purchased.", ephemeral=True)
                     else:
                         total = price * qty
-                        bal = store.get_balance(user.id)
-                        if bal < total:
+                        if store.try_debit(user.id, total) is None:
                             await inter.followup.send(f"Not enough credits. Need **{total}**.", ephemeral=True)
                         else:
-                            store.add_balance(user.id, -total)
                             store.add_item(user.id, name, qty)
                             await inter.followup.send(f"✅ Bought **{qty}× {name}** for **{total}** credits.", ephemeral=True)
                 else:  # sell
@@ -1532,9 +1957,10 @@ async def shop_cmd(inter: discord.Interaction):
                         if have < qty:
                             await inter.followup.send(f"You only have **{have}× {name}**.", ephemeral=True)
                         else:
-                            store.remove_item(user.id, name, qty)
                             total = sell_val * qty
-                            store.add_balance(user.id, total)
+                            with store.transaction():
+                                store.remove_item(user.id, name, qty)
+                                store.add_balance(user.id, total)
                             await inter.followup.send(f"💸 Sold **{qty}× {name}** for **{total}** credits.", ephemeral=True)
 
             try:
@@ -1561,10 +1987,8 @@ async def buy_cmd(inter: discord.Interaction, item: str, quantity: app_commands.
     if meta["price"] is None:
         return await inter.response.send_message("That item cannot be purchased.", ephemeral=True)
     total = int(meta["price"]) * int(quantity)
-    bal = store.get_balance(inter.user.id)
-    if bal < total:
+    if store.try_debit(inter.user.id, total) is None:
         return await inter.response.send_message(f"Not enough credits. Need **{total}**.", ephemeral=True)
-    store.add_balance(inter.user.id, -total)
     store.add_item(inter.user.id, key, quantity)
     await inter.response.send_message(f"✅ Bought **{quantity}× {key}** for **{total}** credits.")
 
@@ -1580,11 +2004,12 @@ async def sell_cmd(inter: discord.Interaction, item: str, quantity: app_commands
         return await inter.response.send_message("That item cannot be sold.", ephemeral=True)
     if not store.has_item(inter.user.id, key, quantity):
         return await inter.response.send_message("You don't have that many.", ephemeral=True)
-    ok = store.remove_item(inter.user.id, key, quantity)
+    total = int(sell_val) * int(quantity)
+    with store.transaction():
+        ok = store.remove_item(inter.user.id, key, quantity)
+        if ok: store.add_balance(inter.user.id, total)
     if not ok:
         return await inter.response.send_message("You don't have that many.", ephemeral=True)
-    total = int(sell_val) * int(quantity)
-    store.add_balance(inter.user.id, total)
     await inter.response.send_message(f"💸 Sold **{quantity}× {key}** for **{total}** credits.")
 
 @tree.command(name="inventory", description="View your inventory (or another user's).")
@@ -1597,65 +2022,64 @@ async def inventory_cmd(inter: discord.Interaction, user: Optional[discord.User]
     emb = discord.Embed(title=f"🎒 Inventory — {target.display_name}", description="\n".join(lines))
     await inter.response.send_message(embed=emb)
 
+def _fish_once(uid: int):
+    # Checks
+    if not store.has_item(uid, "Fishing Pole", 1):
+        return None, None, None, None, "You need a **Fishing Pole**. Buy one with `/buy Fishing Pole`."
+    bait_type = None
+    if store.has_item(uid, "Premium Bait", 1):
+        bait_type = "Premium Bait"
+        table = FISH_TABLE_PREMIUM
+    elif store.has_item(uid, "Basic Bait", 1):
+        bait_type = "Basic Bait"
+        table = FISH_TABLE_BASIC
+    else:
+        return None, None, None, None, "You need **Basic Bait** or **Premium Bait**."
+    # Consume bait
+    store.remove_item(uid, bait_type, 1)
+    catch = weighted_choice(table)
+    store.add_item(uid, catch, 1)
+    sell_val = SHOP_CATALOG.get(catch, {}).get("sell", 0) or 0
+    flair = "🎣"
+    if "Rare" in catch: flair = "💎"
+    if "Epic" in catch: flair = "🌟"
+    return bait_type, catch, sell_val, flair, None
+
+class FishAgainView(discord.ui.View):
+    def __init__(self, uid: int, timeout: float = 180):
+        super().__init__(timeout=timeout)
+        self.uid = uid
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.uid:
+            await interaction.response.send_message("This isn’t your fishing session.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="🎣 Fish again", style=discord.ButtonStyle.primary)
+    async def fish_again(self, interaction: discord.Interaction, button: discord.ui.Button):
+        bait_type, catch, sell_val, flair, err = _fish_once(self.uid)
+        if err:
+            # Disable button if they can't fish anymore
+            button.disabled = True
+            await interaction.response.edit_message(content=err, view=self)
+            return
+        emb = discord.Embed(
+            title="Gone Fishin'",
+            description=f"{flair} You cast your line using **{bait_type}** and caught **{catch}**! (Sell value: **{sell_val}** cr)"
+        )
+        await interaction.response.edit_message(embed=emb, view=self)
+
 @tree.command(name="fish", description="Go fishing! Requires a Fishing Pole and 1 bait (Basic or Premium).")
 async def fish_cmd(inter: discord.Interaction):
     """Fishing with a 'Fish again' button. Consumes bait each time."""
     uid = inter.user.id
-
-    def _fish_once(uid: int):
-        # Checks
-        if not store.has_item(uid, "Fishing Pole", 1):
-            return None, None, None, None, "You need a **Fishing Pole**. Buy one with `/buy Fishing Pole`."
-        bait_type = None
-        if store.has_item(uid, "Premium Bait", 1):
-            bait_type = "Premium Bait"
-            table = FISH_TABLE_PREMIUM
-        elif store.has_item(uid, "Basic Bait", 1):
-            bait_type = "Basic Bait"
-            table = FISH_TABLE_BASIC
-        else:
-            return None, None, None, None, "You need **Basic Bait** or **Premium Bait**."
-        # Consume bait
-        store.remove_item(uid, bait_type, 1)
-        catch = weighted_choice(table)
-        store.add_item(uid, catch, 1)
-        sell_val = SHOP_CATALOG.get(catch, {}).get("sell", 0) or 0
-        flair = "🎣"
-        if "Rare" in catch: flair = "💎"
-        if "Epic" in catch: flair = "🌟"
-        return bait_type, catch, sell_val, flair, None
-
-    class FishAgainView(discord.ui.View):
-        def __init__(self, uid: int, timeout: float = 180):
-            super().__init__(timeout=timeout)
-            self.uid = uid
-
-        async def interaction_check(self, interaction: discord.Interaction) -> bool:
-            if interaction.user.id != self.uid:
-                await interaction.response.send_message("This isn’t your fishing session.", ephemeral=True)
-                return False
-            return True
-
-        @discord.ui.button(label="🎣 Fish again", style=discord.ButtonStyle.primary)
-        async def fish_again(self, interaction: discord.Interaction, button: discord.ui.Button):
-            bait_type, catch, sell_val, flair, err = _fish_once(self.uid)
-            if err:
-                # Disable button if they can't fish anymore
-                button.disabled = True
-                await interaction.response.edit_message(content=err, view=self)
-                return
-            emb = discord.Embed(
-                title="Gone Fishin'",
-                description=f"{flair} You cast your line using **{bait_type}** and caught **{catch}**! (Sell value: **{sell_val}** cr)"
-            )
-            await interaction.response.edit_message(embed=emb, view=self)
-
     # Run the first cast and send initial message with the view
     bait_type, catch, sell_val, flair, err = _fish_once(uid)
-    view = FishAgainView(uid=uid)
     if err:
         await inter.response.send_message(err, ephemeral=True)
         return
+    view = FishAgainView(uid=uid)
     emb = discord.Embed(
         title="Gone Fishin'",
         description=f"{flair} You cast your line using **{bait_type}** and caught **{catch}**! (Sell value: **{sell_val}** cr)"
@@ -1765,8 +2189,10 @@ class PollView(discord.ui.View):
 
 async def update_poll_message(channel: discord.abc.Messageable, message_id: int, poll: dict):
     try:
-        if hasattr(channel, "fetch_message"):
-            msg = await channel.fetch_message(message_id)
+        # Edits only need the id, so skip fetching the message; open polls keep their existing
+        # (persistent) buttons, so no new PollView per vote
+        if hasattr(channel, "get_partial_message"):
+            msg = channel.get_partial_message(message_id)
         else:
             return
         bars = []
@@ -1776,8 +2202,10 @@ async def update_poll_message(channel: discord.abc.Messageable, message_id: int,
             bars.append(f"**{o['label']}** — {o['votes']} ({pct}%)")
         emb = discord.Embed(title="📊 " + poll["question"], description="\n".join(bars))
         emb.set_footer(text="Open" if poll.get("open", True) else "Closed")
-        view = PollView(message_id=message_id, options=[o["label"] for o in poll["options"]], creator_id=poll.get("creator_id", 0))
-        await msg.edit(embed=emb, view=(view if poll.get("open", True) else None))
+        if poll.get("open", True):
+            await msg.edit(embed=emb)
+        else:
+            await msg.edit(embed=emb, view=None)
     except Exception:
         pass
 
@@ -1915,10 +2343,10 @@ async def _fetch_from_the_trivia_api(session: aiohttp.ClientSession, difficulty:
         if not isinstance(data, list) or not data:
             return None
         item = data[0]
-        q = str(item.get("question", {}).get("text", "")).strip()
-        correct = str(item.get("correctAnswer", "")).strip()
+        q = html.unescape(str(item.get("question", {}).get("text", "")).strip())
+        correct = html.unescape(str(item.get("correctAnswer", "")).strip())
         incorrect_raw = item.get("incorrectAnswers", [])
-        incorrect = [str(x).strip() for x in incorrect_raw] if isinstance(incorrect_raw, list) else []
+        incorrect = [html.unescape(str(x).strip()) for x in incorrect_raw] if isinstance(incorrect_raw, list) else []
         if not q or not correct or not incorrect:
             return None
         choices = incorrect + [correct]
@@ -1926,9 +2354,6 @@ async def _fetch_from_the_trivia_api(session: aiohttp.ClientSession, difficulty:
             choices.append("None of the above")
         choices = choices[:4]
         random.shuffle(choices)
-        # Unescape possible HTML entities
-        q = html.unescape(q)
-        choices = [html.unescape(c) for c in choices]
         correct_idx = choices.index(correct) if correct in choices else 3
         return q, choices, correct_idx
     except Exception:
@@ -1973,6 +2398,27 @@ DIFF_CHOICES = [
     app_commands.Choice(name="Hard", value="hard"),
 ]
 
+TRIVIA_LETTERS = ("A", "B", "C", "D")
+
+class TriviaView(discord.ui.View):
+    def __init__(self, uid: int, timeout: float = 30):
+        super().__init__(timeout=timeout)
+        self.uid = uid
+        self.choice: Optional[int] = None
+        for i, lab in enumerate(TRIVIA_LETTERS):
+            self.add_item(self._make_button(lab, i))
+    def _make_button(self, label: str, idx: int):
+        async def cb(interaction: discord.Interaction, idx=idx):
+            if interaction.user.id != self.uid:
+                await interaction.response.send_message("This question isn't for you.", ephemeral=True)
+                return
+            self.choice = idx
+            await interaction.response.defer()
+            self.stop()
+        btn = discord.ui.Button(label=label, style=discord.ButtonStyle.primary)
+        btn.callback = cb
+        return btn
+
 @tree.command(name="trivia", description="Answer a multiple-choice question for credits (powered by OpenTDB).")
 @app_commands.describe(difficulty="Pick a difficulty (default Any).")
 @app_commands.choices(difficulty=DIFF_CHOICES)
@@ -1986,30 +2432,10 @@ async def trivia(inter: discord.Interaction, difficulty: Optional[app_commands.C
         return
     q, choices, correct_idx = fetched
     emb = discord.Embed(title="🧠 Trivia Time", description=q)
-    letters = ["A","B","C","D"]
     for i, c in enumerate(choices):
-        emb.add_field(name=letters[i], value=html.unescape(c), inline=False)
+        emb.add_field(name=TRIVIA_LETTERS[i], value=c, inline=False)
     emb.set_footer(text=f"Correct = +{TRIVIA_REWARD} credits")
 
-    class TriviaView(discord.ui.View):
-        def __init__(self, uid: int, timeout: float = 30):
-            super().__init__(timeout=timeout)
-            self.uid = uid
-            self.choice: Optional[int] = None
-            for i, lab in enumerate(letters):
-                self.add_item(self._make_button(lab, i))
-        def _make_button(self, label: str, idx: int):
-            async def cb(interaction: discord.Interaction, idx=idx):
-                if interaction.user.id != self.uid:
-                    await interaction.response.send_message("This question isn't for you.", ephemeral=True)
-                    return
-                self.choice = idx
-                await interaction.response.defer()
-                self.stop()
-            btn = discord.ui.Button(label=label, style=discord.ButtonStyle.primary)
-            btn.callback = cb
-            return btn
-
     view = TriviaView(uid=inter.user.id, timeout=30)
     msg = await inter.followup.send(embed=emb, view=view)
     await view.wait()
@@ -2020,27 +2446,65 @@ async def trivia(inter: discord.Interaction, difficulty: Optional[app_commands.C
         store.add_balance(inter.user.id, TRIVIA_REWARD)
         await msg.edit(content=f"✅ Correct! You earned **{TRIVIA_REWARD}** credits.", embed=None, view=None)
     else:
-        await msg.edit(content=f"❌ Nope. Correct answer was **{letters[correct_idx]}**.", embed=None, view=None)
+        await msg.edit(content=f"❌ Nope. Correct answer was **{TRIVIA_LETTERS[correct_idx]}**.", embed=None, view=None)
 
 # ---------- Blackjack (Dealer or PvP) ----------
 def is_blackjack(cards: List[Tuple[str, str]]) -> bool:
     return len(cards) == 2 and hand_value(cards) == 21
 
-class PvPBlackjackView(discord.ui.View):
-    def __init__(self, current_player_id: int, timeout: float = 120):
-        super().__init__(timeout=timeout)
-        self.current_player_id = current_player_id
+# (p1 busted, p2 busted, sign(v1 - v2)) -> winner: 0 = push, 1 = p1, 2 = p2
+_PVP_BJ_WINNER = {
+    **{(True, True, c): 0 for c in (-1, 0, 1)},
+    **{(True, False, c): 2 for c in (-1, 0, 1)},
+    **{(False, True, c): 1 for c in (-1, 0, 1)},
+    (False, False, -1): 2, (False, False, 0): 0, (False, False, 1): 1,
+}
+
+# winner code -> (p1 result, p2 result, sign of p1's payout)
+_DUEL_OUTCOMES = {0: ("push", "push", 0), 1: ("win", "loss", 1), 2: ("loss", "win", -1)}
+
+def _settle_duel(winner: int, bet: int, p1_id: int, p2_id: Optional[int] = None):
+    # Payouts + W/L/P for a two-sided game in one commit; p2_id=None means the house (no wallet/stats)
+    r1, r2, sign = _DUEL_OUTCOMES[winner]
+    with store.transaction():
+        if sign and bet:
+            store.add_balance(p1_id, sign * bet)
+            if p2_id: store.add_balance(p2_id, -sign * bet)
+        store.add_result(p1_id, r1)
+        if p2_id: store.add_result(p2_id, r2)
+
+def _pvp_bj_result(bet: int, p1: Tuple[str, list], p2: Tuple[str, list], outcome: str) -> discord.Embed:
+    emb = discord.Embed(title="♠ PvP Blackjack — Result", description=f"Bet each: **{bet}**")
+    emb.add_field(name=p1[0], value=fmt_hand(p1[1]), inline=True)
+    emb.add_field(name=p2[0], value=fmt_hand(p2[1]), inline=True)
+    emb.add_field(name="Outcome", value=outcome, inline=False)
+    return emb
+
+class BlackjackView(discord.ui.View):
+    """Hit/Stand buttons kept on the game message for the whole game; moves are read with next_choice()."""
+    def __init__(self, player_id: int, not_yours: str = "It's not your turn.", move_timeout: float = 120):
+        super().__init__(timeout=None)
+        self.player_id = player_id; self.not_yours = not_yours; self.move_timeout = move_timeout
         self.choice: Optional[str] = None
+        self._moved = asyncio.Event()
+    def begin_turn(self, player_id: int):
+        self.player_id = player_id; self.choice = None; self._moved.clear()
+    async def next_choice(self) -> Optional[str]:
+        # None means the player let the move time out (treated as a stand).
+        try: await asyncio.wait_for(self._moved.wait(), timeout=self.move_timeout)
+        except asyncio.TimeoutError: return None
+        self._moved.clear(); choice, self.choice = self.choice, None
+        return choice
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
-        if interaction.user.id != self.current_player_id:
-            await interaction.response.send_message("It's not your turn.", ephemeral=True); return False
+        if interaction.user.id != self.player_id:
+            await interaction.response.send_message(self.not_yours, ephemeral=True); return False
         return True
     @discord.ui.button(label="Hit", style=discord.ButtonStyle.primary)
     async def hit(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.choice = "hit"; await interaction.response.defer(); self.stop()
+        self.choice = "hit"; await interaction.response.defer(); self._moved.set()
     @discord.ui.button(label="Stand", style=discord.ButtonStyle.secondary)
     async def stand(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.choice = "stand"; await interaction.response.defer(); self.stop()
+        self.choice = "stand"; await interaction.response.defer(); self._moved.set()
 
 class PvPChallengeView(discord.ui.View):
     def __init__(self, challenger_id: int, challenged_id: int, timeout: float = PVP_TIMEOUT):
@@ -2069,96 +2533,70 @@ async def blackjack(inter: discord.Interaction, bet: app_commands.Range[int, 1,
         await view_challenge.wait()
         if view_challenge.accepted is None: return await inter.followup.send("⌛ Challenge expired.")
         if not view_challenge.accepted: return await inter.followup.send("🚫 Challenge declined.")
-        deck = deal_deck(); p1 = [deck.pop(), deck.pop()]; p2 = [deck.pop(), deck.pop()]; current_player_id = inter.user.id
+        deck = deck_pool.pop(); p1 = Hand((deck.pop(), deck.pop())); p2 = Hand((deck.pop(), deck.pop())); current_player_id = inter.user.id
+        # One embed for the whole game; each update rewrites its title/field values in place
+        state_emb = discord.Embed(description=f"Bet each: **{bet}**")
+        state_emb.add_field(name=f"{inter.user.display_name}", value="", inline=True)
+        state_emb.add_field(name=f"{opponent.display_name}", value="", inline=True)
+        state_emb.add_field(name="Turn", value="", inline=False)
         def embed_state(title_suffix: str = ""):
-            title = f"♠ PvP Blackjack {title_suffix}".strip()
-            emb = discord.Embed(title=title, description=f"Bet each: **{bet}**")
-            emb.add_field(name=f"{inter.user.display_name}", value=fmt_hand(p1), inline=True)
-            emb.add_field(name=f"{opponent.display_name}", value=fmt_hand(p2), inline=True)
-            emb.add_field(name="Turn", value=f"▶️ **{inter.user.display_name if current_player_id==inter.user.id else opponent.display_name}**", inline=False)
-            return emb
-        view = PvPBlackjackView(current_player_id=current_player_id)
+            state_emb.title = f"♠ PvP Blackjack {title_suffix}".strip()
+            state_emb.set_field_at(0, name=f"{inter.user.display_name}", value=fmt_hand(p1), inline=True)
+            state_emb.set_field_at(1, name=f"{opponent.display_name}", value=fmt_hand(p2), inline=True)
+            state_emb.set_field_at(2, name="Turn", value=f"▶️ **{inter.user.display_name if current_player_id==inter.user.id else opponent.display_name}**", inline=False)
+            return state_emb
+        # One view for the whole game; turns just move the buttons to the other player.
+        view = BlackjackView(player_id=current_player_id)
         msg = await inter.followup.send(embed=embed_state("— Game Start"), view=view)
-        async def play_turn(player_id: int, hand: List[Tuple[str, str]], name: str):
-            nonlocal view, msg, current_player_id
-            current_player_id = player_id; view = PvPBlackjackView(current_player_id=current_player_id)
-            try: await msg.edit(embed=embed_state(), view=view)
+        async def play_turn(player_id: int, hand: List[Tuple[str, str]]):
+            nonlocal current_player_id
+            current_player_id = player_id; view.begin_turn(player_id)
+            try: await msg.edit(embed=embed_state())
             except discord.HTTPException: pass
             while hand_value(hand) < 21:
-                await view.wait(); choice = view.choice; view.choice = None
-                if choice == "hit":
-                    hand.append(deck.pop())
-                    try: await msg.edit(embed=embed_state())
-                    except discord.HTTPException: pass
-                    view = PvPBlackjackView(current_player_id=current_player_id)
-                    try: await msg.edit(view=view)
-                    except discord.HTTPException: pass
-                    continue
-                else: break
-            for child in view.children:
-                if isinstance(child, discord.ui.Button): child.disabled = True
-            try: await msg.edit(view=view)
-            except discord.HTTPException: pass
-        await play_turn(inter.user.id, p1, inter.user.display_name); await play_turn(opponent.id, p2, opponent.display_name)
-        v1 = hand_value(p1); v2 = hand_value(p2); outcome = "Tie! It’s a push."
-        if v1 > 21 and v2 > 21: store.add_result(inter.user.id, "push"); store.add_result(opponent.id, "push")
-        elif v1 > 21:
-            outcome = f"**{opponent.display_name}** wins!"; store.add_balance(inter.user.id, -bet); store.add_balance(opponent.id, bet); store.add_result(inter.user.id, "loss"); store.add_result(opponent.id, "win")
-        elif v2 > 21:
-            outcome = f"**{inter.user.display_name}** wins!"; store.add_balance(opponent.id, -bet); store.add_balance(inter.user.id, bet); store.add_result(opponent.id, "loss"); store.add_result(inter.user.id, "win")
-        else:
-            if v1 > v2:
-                outcome = f"**{inter.user.display_name}** wins!"; store.add_balance(opponent.id, -bet); store.add_balance(inter.user.id, bet); store.add_result(opponent.id, "loss"); store.add_result(inter.user.id, "win")
-            elif v2 > v1:
-                outcome = f"**{opponent.display_name}** wins!"; store.add_balance(inter.user.id, -bet); store.add_balance(opponent.id, bet); store.add_result(inter.user.id, "loss"); store.add_result(opponent.id, "win")
-            else: store.add_result(inter.user.id, "push"); store.add_result(opponent.id, "push")
-        emb = discord.Embed(title="♠ PvP Blackjack — Result", description=f"Bet each: **{bet}**")
-        emb.add_field(name=inter.user.display_name, value=fmt_hand(p1), inline=True)
-        emb.add_field(name=opponent.display_name, value=fmt_hand(p2), inline=True)
-        emb.add_field(name="Outcome", value=outcome, inline=False)
+                if await view.next_choice() != "hit": break
+                hand.append(deck.pop())
+                try: await msg.edit(embed=embed_state())
+                except discord.HTTPException: pass
+        await play_turn(inter.user.id, p1); await play_turn(opponent.id, p2)
+        view.stop()
+        v1 = hand_value(p1); v2 = hand_value(p2)
+        winner = _PVP_BJ_WINNER[(v1 > 21, v2 > 21, (v1 > v2) - (v1 < v2))]
+        _settle_duel(winner, bet, inter.user.id, opponent.id)
+        match winner:
+            case 0: outcome = "Tie! It’s a push."
+            case 1: outcome = f"**{inter.user.display_name}** wins!"
+            case _: outcome = f"**{opponent.display_name}** wins!"
+        emb = _pvp_bj_result(bet, (inter.user.display_name, p1), (opponent.display_name, p2), outcome)
         try: await msg.edit(embed=emb, view=None)
         except discord.HTTPException: await inter.followup.send(embed=emb)
         return
     # Dealer
-    deck = deal_deck(); player = [deck.pop(), deck.pop()]; dealer = [deck.pop(), deck.pop()]
-    class DealerView(discord.ui.View):
-        def __init__(self, uid: int, timeout: float = 120):
-            super().__init__(timeout=timeout); self.uid = uid; self.choice: Optional[str] = None
-        async def interaction_check(self, interaction: discord.Interaction) -> bool:
-            if interaction.user.id != self.uid: await interaction.response.send_message("This isn’t your game.", ephemeral=True); return False
-            return True
-        @discord.ui.button(label="Hit", style=discord.ButtonStyle.primary)
-        async def hit(self, interaction: discord.Interaction, button: discord.ui.Button):
-            self.choice = "hit"; await interaction.response.defer(); self.stop()
-        @discord.ui.button(label="Stand", style=discord.ButtonStyle.secondary)
-        async def stand(self, interaction: discord.Interaction, button: discord.ui.Button):
-            self.choice = "stand"; await interaction.response.defer(); self.stop()
+    deck = deck_pool.pop(); player = Hand((deck.pop(), deck.pop())); dealer = Hand((deck.pop(), deck.pop()))
+    dealer_emb = discord.Embed(description=f"Bet: **{bet}**")
+    dealer_emb.add_field(name="Your Hand", value="", inline=True)
+    dealer_emb.add_field(name="Dealer Shows", value=f"{dealer[0][0]}{dealer[0][1]} ??", inline=True)
     def dealer_embed(title="♣ Blackjack vs Dealer"):
-        emb = discord.Embed(title=title, description=f"Bet: **{bet}**")
-        emb.add_field(name="Your Hand", value=fmt_hand(player), inline=True)
-        emb.add_field(name="Dealer Shows", value=f"{dealer[0][0]}{dealer[0][1]} ??", inline=True)
-        return emb
-    await inter.response.send_message(embed=dealer_embed(), view=DealerView(uid=inter.user.id))
+        # Only the player's hand changes between hits; update the one embed in place
+        dealer_emb.title = title
+        dealer_emb.set_field_at(0, name="Your Hand", value=fmt_hand(player), inline=True)
+        return dealer_emb
+    view = BlackjackView(player_id=inter.user.id, not_yours="This isn’t your game.")
+    await inter.response.send_message(embed=dealer_embed(), view=view)
     msg = await inter.original_response()
-    view = DealerView(uid=inter.user.id); await msg.edit(view=view)
-    while True:
-        if hand_value(player) >= 21: break
-        await view.wait(); choice = view.choice; view.choice = None
-        if choice == "hit":
-            player.append(deck.pop())
-            try: await msg.edit(embed=dealer_embed(), view=view)
-            except discord.HTTPException: pass
-            view = DealerView(uid=inter.user.id)
-            try: await msg.edit(view=view)
-            except discord.HTTPException: pass
-            continue
-        else: break
+    while hand_value(player) < 21:
+        if await view.next_choice() != "hit": break
+        player.append(deck.pop())
+        try: await msg.edit(embed=dealer_embed())
+        except discord.HTTPException: pass
+    view.stop()
     while hand_value(dealer) < 17: dealer.append(deck.pop())
     pv = hand_value(player); dv = hand_value(dealer)
-    if pv > 21: result = "You busted. Dealer wins."; store.add_balance(inter.user.id, -bet); store.add_result(inter.user.id, "loss")
-    elif dv > 21 or pv > dv: result = "You win!"; store.add_balance(inter.user.id, bet); store.add_result(inter.user.id, "win")
-    elif dv > pv: result = "Dealer wins."; store.add_balance(inter.user.id, -bet); store.add_result(inter.user.id, "loss")
-    else: result = "Push."; store.add_result(inter.user.id, "push")
+    with store.transaction():
+        if pv > 21: result = "You busted. Dealer wins."; store.add_balance(inter.user.id, -bet); store.add_result(inter.user.id, "loss")
+        elif dv > 21 or pv > dv: result = "You win!"; store.add_balance(inter.user.id, bet); store.add_result(inter.user.id, "win")
+        elif dv > pv: result = "Dealer wins."; store.add_balance(inter.user.id, -bet); store.add_result(inter.user.id, "loss")
+        else: result = "Push."; store.add_result(inter.user.id, "push")
     final = discord.Embed(title="♣ Blackjack vs Dealer — Result", description=f"Bet: **{bet}**")
     final.add_field(name="Your Hand", value=fmt_hand(player), inline=True)
     final.add_field(name="Dealer Hand", value=fmt_hand(dealer), inline=True)
@@ -2166,27 +2604,27 @@ async def blackjack(inter: discord.Interaction, bet: app_commands.Range[int, 1,
     await msg.edit(embed=final, view=None)
 
 # ---------- High/Low ----------
+_HL_ORDER: Dict[str, int] = {r: i for i, r in enumerate(["2","3","4","5","6","7","8","9","10","J","Q","K","A"])}
+
+class HLView(discord.ui.View):
+    def __init__(self, uid: int, timeout: float = 60):
+        super().__init__(timeout=timeout); self.uid = uid; self.choice: Optional[str] = None
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.uid: await interaction.response.send_message("This isn’t your round.", ephemeral=True); return False
+        return True
+    @discord.ui.button(label="Higher", style=discord.ButtonStyle.primary)
+    async def higher(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.choice = "higher"; await interaction.response.defer(); self.stop()
+    @discord.ui.button(label="Lower", style=discord.ButtonStyle.secondary)
+    async def lower(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.choice = "lower"; await interaction.response.defer(); self.stop()
+
 @tree.command(name="highlow", description="Guess if the next card is higher or lower (1:1 payout).")
 @app_commands.describe(bet="Amount to wager")
 async def highlow(inter: discord.Interaction, bet: app_commands.Range[int, 1, 1_000_000]):
     if store.get_balance(inter.user.id) < bet:
         return await inter.response.send_message("❌ Not enough credits for that bet.", ephemeral=True)
-    deck = deal_deck(); first = deck.pop()
-    def rank_value(r: str) -> int:
-        order = ["2","3","4","5","6","7","8","9","10","J","Q","K","A"]
-        return order.index(r)
-    class HLView(discord.ui.View):
-        def __init__(self, uid: int, timeout: float = 60):
-            super().__init__(timeout=timeout); self.uid = uid; self.choice: Optional[str] = None
-        async def interaction_check(self, interaction: discord.Interaction) -> bool:
-            if interaction.user.id != self.uid: await interaction.response.send_message("This isn’t your round.", ephemeral=True); return False
-            return True
-        @discord.ui.button(label="Higher", style=discord.ButtonStyle.primary)
-        async def higher(self, interaction: discord.Interaction, button: discord.ui.Button):
-            self.choice = "higher"; await interaction.response.defer(); self.stop()
-        @discord.ui.button(label="Lower", style=discord.ButtonStyle.secondary)
-        async def lower(self, interaction: discord.Interaction, button: discord.ui.Button):
-            self.choice = "lower"; await interaction.response.defer(); self.stop()
+    first, second = draw_cards(2)
     def make_embed(title="♦ High/Low"):
         emb = discord.Embed(title=title, description=f"Bet: **{bet}**")
         emb.add_field(name="Current Card", value=f"{first[0]}{first[1]}", inline=True)
@@ -2194,7 +2632,7 @@ async def highlow(inter: discord.Interaction, bet: app_commands.Range[int, 1, 1_
     view = HLView(uid=inter.user.id)
     await inter.response.send_message(embed=make_embed(), view=view); msg = await inter.original_response()
     await view.wait()
-    second = deck.pop(); first_v = rank_value(first[0]); second_v = rank_value(second[0])
+    first_v = _HL_ORDER[first[0]]; second_v = _HL_ORDER[second[0]]
     outcome = "Push."; result_tag = "push"
     if view.choice is None: pass
     elif second_v == first_v: outcome = "Equal rank! Push."
@@ -2227,22 +2665,19 @@ async def diceduel(inter: discord.Interaction, opponent: discord.User, bet: Opti
     await view.wait()
     if view.accepted is None: return await inter.followup.send("⌛ Challenge expired.")
     if not view.accepted: return await inter.followup.send("🚫 Challenge declined.")
-    def roll2(): return random.randint(1,6), random.randint(1,6)
+    rng = _game_rng.get()
+    def roll2(): return rng.randint(1,6), rng.randint(1,6)
     rerolls = 3; history = []
     while True:
         a = roll2(); b = roll2(); sa, sb = sum(a), sum(b); history.append((a, sa, b, sb))
         if sa != sb or rerolls == 0: break
         rerolls -= 1
-    if sa > sb:
-        outcome = f"**{inter.user.display_name}** wins! ({a[0]}+{a[1]}={sa} vs {b[0]}+{b[1]}={sb})"
-        if bet: store.add_balance(inter.user.id, bet); store.add_balance(opponent.id, -bet)
-        store.add_result(inter.user.id, "win"); store.add_result(opponent.id, "loss")
-    elif sb > sa:
-        outcome = f"**{opponent.display_name}** wins! ({b[0]}+{b[1]}={sb} vs {a[0]}+{a[1]}={sa})"
-        if bet: store.add_balance(inter.user.id, -bet); store.add_balance(opponent.id, bet)
-        store.add_result(opponent.id, "win"); store.add_result(inter.user.id, "loss")
-    else:
-        outcome = f"Tie after rerolls ({sa}={sb}). It's a push."; store.add_result(opponent.id, "push"); store.add_result(inter.user.id, "push")
+    winner = 1 if sa > sb else (2 if sb > sa else 0)
+    _settle_duel(winner, bet or 0, inter.user.id, opponent.id)
+    match winner:
+        case 1: outcome = f"**{inter.user.display_name}** wins! ({a[0]}+{a[1]}={sa} vs {b[0]}+{b[1]}={sb})"
+        case 2: outcome = f"**{opponent.display_name}** wins! ({b[0]}+{b[1]}={sb} vs {a[0]}+{a[1]}={sa})"
+        case _: outcome = f"Tie after rerolls ({sa}={sb}). It's a push."
     desc_lines = [f"Round {i+1}: 🎲 {h[0][0]}+{h[0][1]}={h[1]}  vs  🎲 {h[2][0]}+{h[2][1]}={h[3]}" for i, h in enumerate(history)]
     emb = discord.Embed(title="🎲 Dice Duel Results", description="\n".join(desc_lines))
     emb.add_field(name="Outcome", value=outcome, inline=False)
@@ -2256,21 +2691,20 @@ async def coinflip(inter: discord.Interaction, bet: app_commands.Range[int, 1, 1
     if choice not in ("heads", "tails"):
         return await inter.response.send_message("Pick **heads** or **tails**.", ephemeral=True)
 
-    bal = store.get_balance(inter.user.id)  # wallet helpers already exist 
-    if bet > bal:
+    new_bal = store.try_debit(inter.user.id, bet)  # take bet 
+    if new_bal is None:
         return await inter.response.send_message("❌ You don't have that many credits.", ephemeral=True)
-    store.add_balance(inter.user.id, -bet)        # take bet 
 
     import random
     result = random.choice(["heads", "tails"])
     if result == choice:
         payout = bet * 2
-        store.add_balance(inter.user.id, payout)  # pay out 
+        new_bal = store.add_balance(inter.user.id, payout)  # pay out 
         store.add_result(inter.user.id, "win")    # stats W/L/P are tracked 
-        msg = f"🪙 It’s **{result}**! You won **{payout - bet}**. Balance: **{store.get_balance(inter.user.id)}**"
+        msg = f"🪙 It’s **{result}**! You won **{payout - bet}**. Balance: **{new_bal}**"
     else:
         store.add_result(inter.user.id, "loss")
-        msg = f"🪙 It’s **{result}**. You lost **{bet}**. Balance: **{store.get_balance(inter.user.id)}**"
+        msg = f"🪙 It’s **{result}**. You lost **{bet}**. Balance: **{new_bal}**"
 
     await inter.response.send_message(msg)
 # ============================
@@ -2431,11 +2865,11 @@ async def sell_business(inter: discord.Interaction, name: str, confirm: str = "N
     if confirm.upper() != "YES":
         return await inter.response.send_message(f"Type `YES` to confirm selling **{name} (L{lvl})** for **{value}**.", ephemeral=True)
 
-    store.remove_item(inter.user.id, _inv_name(name), 1)
-    store.add_balance(inter.user.id, value)
-    # clear notes
-    store.set_note(inter.user.id, _note_key_ts(name), "")
-    store.set_note(inter.user.id, _note_key_lvl(name), "")
+    with store.transaction():
+        store.remove_item(inter.user.id, _inv_name(name), 1)
+        store.add_balance(inter.user.id, value)
+        # clear notes
+        store.set_notes(inter.user.id, {_note_key_ts(name): "", _note_key_lvl(name): ""})
     await inter.response.send_message(f"💸 Sold **{name} (L{lvl})** for **{value}**.")
 
 @tree.command(name="upgrade_business", description="Upgrade a business to increase its yield.")
@@ -2450,11 +2884,11 @@ async def upgrade_business(inter: discord.Interaction, name: str):
         return await inter.response.send_message(f"⚠️ **{name}** is already max level (L{MAX_LEVEL}).", ephemeral=True)
 
     cost = int(base["cost"] * (lvl) * UPGRADE_FACTOR)
-    if store.get_balance(inter.user.id) < cost:
+    with store.transaction():
+        paid = store.try_debit(inter.user.id, cost) is not None
+        if paid: _set_level(inter.user.id, name, lvl+1)
+    if not paid:
         return await inter.response.send_message(f"Need **{cost}** credits to upgrade to L{lvl+1}.", ephemeral=True)
-
-    store.add_balance(inter.user.id, -cost)
-    _set_level(inter.user.id, name, lvl+1)
     new_yield = int(base["yield"] * LEVEL_MULTIPLIER[lvl])  # lvl+1 index
     await inter.response.send_message(
         f"⬆️ Upgraded **{name}** to **L{lvl+1}**. New yield: **{new_yield}** every **{base['hours']}h**."
@@ -2470,38 +2904,39 @@ async def collect_business(inter: discord.Interaction):
     total_earned = 0
     lines = []
 
-    for name in owned:
-        base = BUSINESSES.get(name)
-        if not base:
-            continue
-        lvl = _get_level(inter.user.id, name)
-        mult = LEVEL_MULTIPLIER[lvl-1]
-        per_cycle = int(base["yield"] * mult)
-
-        last = _get_last_ts(inter.user.id, name)
-        if not last:
-            _set_ts(inter.user.id, name, now_utc())
-            lines.append(f"• **{name} (L{lvl})** — timer started. Come back later.")
-            continue
+    with store.transaction():  # every payout + timer reset lands in one commit
+        for name in owned:
+            base = BUSINESSES.get(name)
+            if not base:
+                continue
+            lvl = _get_level(inter.user.id, name)
+            mult = LEVEL_MULTIPLIER[lvl-1]
+            per_cycle = int(base["yield"] * mult)
+
+            last = _get_last_ts(inter.user.id, name)
+            if not last:
+                _set_ts(inter.user.id, name, now_utc())
+                lines.append(f"• **{name} (L{lvl})** — timer started. Come back later.")
+                continue
 
-        hours = base["hours"]
-        elapsed_h = (now_utc() - last).total_seconds() / 3600.0
-        cycles = int(elapsed_h // hours)
+            hours = base["hours"]
+            elapsed_h = (now_utc() - last).total_seconds() / 3600.0
+            cycles = int(elapsed_h // hours)
 
-        if cycles <= 0:
-            rem = hours - elapsed_h
-            lines.append(f"• **{name} (L{lvl})** — not ready. (~{rem:.1f}h left)")
-            continue
+            if cycles <= 0:
+                rem = hours - elapsed_h
+                lines.append(f"• **{name} (L{lvl})** — not ready. (~{rem:.1f}h left)")
+                continue
 
-        label, event_mult = _weighted_event()
-        earned = int(per_cycle * cycles * event_mult)
-        total_earned += earned
-        store.add_balance(inter.user.id, earned)
-        _set_ts(inter.user.id, name, last + timedelta(hours=cycles*hours))
+            label, event_mult = _weighted_event()
+            earned = int(per_cycle * cycles * event_mult)
+            total_earned += earned
+            store.add_balance(inter.user.id, earned)
+            _set_ts(inter.user.id, name, last + timedelta(hours=cycles*hours))
 
-        base_amt = per_cycle * cycles
-        note_event = "" if event_mult == 1.0 else f" × {event_mult:.2f} **{label}**"
-        lines.append(f"• **{name} (L{lvl})** — {cycles}× cycles: {base_amt}{note_event} → **{earned}**")
+            base_amt = per_cycle * cycles
+            note_event = "" if event_mult == 1.0 else f" × {event_mult:.2f} **{label}**"
+            lines.append(f"• **{name} (L{lvl})** — {cycles}× cycles: {base_amt}{note_event} → **{earned}**")
 
     if total_earned == 0:
         return await inter.response.send_message("\n".join(lines))
@@ -2526,9 +2961,10 @@ class BuyBusinessView(discord.ui.View):
 
         # Build select options
         bal = store.get_balance(user_id)
+        inv = store.get_inventory(user_id) or {}  # one read, not one per business
         options: list[discord.SelectOption] = []
         for name, cfg in BUSINESSES.items():
-            if _owns(user_id, name):  # one of each business in this model
+            if inv.get(_inv_name(name), 0) > 0:  # one of each business in this model
                 continue
             if affordable_only and bal < cfg["cost"]:
                 continue
@@ -2587,15 +3023,12 @@ class BuyBusinessView(discord.ui.View):
         if _owns(self.user_id, name):
             return await inter.response.send_message("You already own this business.", ephemeral=True)
 
-        bal = store.get_balance(self.user_id)
-        if bal < cfg["cost"]:
+        # Perform purchase (debit only succeeds if the balance still covers it)
+        new_bal = store.try_debit(self.user_id, cfg["cost"])
+        if new_bal is None:
             return await inter.response.send_message("You don’t have enough credits anymore.", ephemeral=True)
-
-        # Perform purchase
-        store.add_balance(self.user_id, -cfg["cost"])
         store.add_item(self.user_id, _inv_name(name), 1)
-        _set_level(self.user_id, name, 1)
-        _set_ts(self.user_id, name, now_utc())
+        store.set_notes(self.user_id, {_note_key_lvl(name): "1", _note_key_ts(name): now_utc().isoformat()})
 
         # Finish UI
         self.select.disabled = True
@@ -2606,13 +3039,13 @@ class BuyBusinessView(discord.ui.View):
                     title="✅ Purchased",
                     description=(f"You bought **{name} (L1)** for **{cfg['cost']}**.\n"
                                  f"It pays **{cfg['yield']}** every **{cfg['hours']}h**.\n"
-                                 f"New balance: **{store.get_balance(self.user_id)}**")
+                                 f"New balance: **{new_bal}**")
                 ),
                 view=self
             )
         except Exception:
             await inter.followup.send(
-                f"✅ Bought **{name}**. New balance: **{store.get_balance(self.user_id)}**",
+                f"✅ Bought **{name}**. New balance: **{new_bal}**",
                 ephemeral=True
             )
 
@@ -2645,31 +3078,31 @@ async def business_name_autocomplete(inter: discord.Interaction, current: str):
     names = [name for name in BUSINESSES.keys() if current in name.lower()]
     return [app_commands.Choice(name=n, value=n) for n in names[:25]]
 
-@tree.command(name="business_catalog", description="View all available businesses and their stats.")
-@app_commands.describe(affordable_only="Show only businesses you can afford right now")
-async def business_catalog(inter: discord.Interaction, affordable_only: bool = False):
-    bal = store.get_balance(inter.user.id)
+@functools.lru_cache(maxsize=1)
+def _business_catalog_lines() -> Tuple[Tuple[int, str], ...]:
+    # BUSINESSES is static: format every row once, sorted by cost
     rows = []
     for name, cfg in BUSINESSES.items():
         cost, base_y, hrs = cfg["cost"], cfg["yield"], cfg["hours"]
-        if affordable_only and bal < cost:
-            continue
         per_day = _daily_yield(base_y, hrs, 1.0)
-        rows.append((name, cost, base_y, hrs, per_day, _roi_days(cost, per_day)))
+        rows.append((cost, f"**{name}** — Cost **{cost}** • Pays **{base_y}** / **{hrs}h** "
+                           f"(~{per_day}/day) • ROI ~ {_roi_days(cost, per_day)}"))
+    rows.sort(key=lambda r: r[0])
+    return tuple(rows)
+
+@tree.command(name="business_catalog", description="View all available businesses and their stats.")
+@app_commands.describe(affordable_only="Show only businesses you can afford right now")
+async def business_catalog(inter: discord.Interaction, affordable_only: bool = False):
+    rows = _business_catalog_lines()
+    if affordable_only:
+        bal = store.get_balance(inter.user.id)
+        rows = [r for r in rows if r[0] <= bal]
 
     if not rows:
         msg = "Nothing you can afford yet." if affordable_only else "No businesses configured."
         return await inter.response.send_message(msg, ephemeral=True)
 
-    rows.sort(key=lambda r: r[1])  # by cost
-    lines = []
-    for (name, cost, base_y, hrs, per_day, roi) in rows:
-        lines.append(
-            f"**{name}** — Cost **{cost}** • Pays **{base_y}** / **{hrs}h** "
-            f"(~{per_day}/day) • ROI ~ {roi}"
-        )
-
-    emb = discord.Embed(title="🏢 Business Catalog", description="\n".join(lines))
+    emb = discord.Embed(title="🏢 Business Catalog", description="\n".join(line for _, line in rows))
     emb.set_footer(text="Tip: Use /business_info <name> for level math & upgrade costs.")
     await inter.response.send_message(embed=emb)
 
@@ -2729,12 +3162,15 @@ async def business_info(inter: discord.Interaction, name: str):
 
     await inter.response.send_message(embed=emb)
 
+_BUSINESS_EVENTS_TEXT = "\n".join(
+    [f"• {label}: ×{mult:.2f} • p={p*100:.0f}%" for (label, mult, p) in BUSINESS_EVENTS]
+    + ["• Normal Day: ×1.00 • remaining probability"]
+)
+
 @tree.command(name="business_events", description="Show possible random events and their effects.")
 async def business_events(inter: discord.Interaction):
-    lines = [f"• {label}: ×{mult:.2f} • p={p*100:.0f}%" for (label, mult, p) in BUSINESS_EVENTS]
-    lines.append("• Normal Day: ×1.00 • remaining probability")
     await inter.response.send_message(
-        embed=discord.Embed(title="🎲 Business Random Events", description="\n".join(lines))
+        embed=discord.Embed(title="🎲 Business Random Events", description=_BUSINESS_EVENTS_TEXT)
     )
 
 # ---------- Connect 4 (AI or PvP, wagerable) ----------
@@ -2856,15 +3292,7 @@ class Connect4View(discord.ui.View):
             else:
                 loser = self.current_player_id
                 winner = self.starter_id if loser == self.opponent_id else self.opponent_id
-                store.add_balance(loser, -self.bet)
-                store.add_balance(winner, self.bet)
-                try:
-                    if loser == self.starter_id:
-                        store.add_result(self.starter_id, "loss"); store.add_result(self.opponent_id, "win")
-                    else:
-                        store.add_result(self.opponent_id, "loss"); store.add_result(self.starter_id, "win")
-                except Exception:
-                    pass
+                _settle_duel(1, self.bet, winner, loser)
                 await self._end(inter, f"🏳️ <@{loser}> resigned. **<@{winner}>** wins **{self.bet}** credits.", disable=True)
         btn.callback = cb
         return btn
@@ -2879,25 +3307,20 @@ class Connect4View(discord.ui.View):
         # Check human win
         if c4_check_winner(self.board, self.turn):
             if self.mode == "ai":
-                store.add_balance(self.starter_id, self.bet)
-                store.add_result(self.starter_id, "win")
+                _settle_duel(1, self.bet, self.starter_id)
                 await self._end(inter, f"✅ **You win!** +{self.bet} credits.", disable=True)
             else:
                 # current player wins PvP
                 winner = self.current_player_id
                 loser = self.starter_id if winner == self.opponent_id else self.opponent_id
-                store.add_balance(winner, self.bet); store.add_balance(loser, -self.bet)
-                store.add_result(winner, "win"); store.add_result(loser, "loss")
+                _settle_duel(1, self.bet, winner, loser)
                 await self._end(inter, f"✅ **<@{winner}> wins!** Takes **{self.bet}** from <@{loser}>.", disable=True)
             return
 
         if c4_full(self.board):
             await self._end(inter, "🤝 Draw! No credits exchanged.", disable=True)
             try:
-                if self.mode == "ai":
-                    store.add_result(self.starter_id, "push")
-                else:
-                    store.add_result(self.starter_id, "push"); store.add_result(self.opponent_id, "push")
+                _settle_duel(0, 0, self.starter_id, self.opponent_id if self.mode != "ai" else None)
             except Exception:
                 pass
             return
@@ -2916,8 +3339,7 @@ class Connect4View(discord.ui.View):
                 return
             c4_drop(self.board, ai_col, C4_P2)
             if c4_check_winner(self.board, C4_P2):
-                store.add_balance(self.starter_id, -self.bet)
-                store.add_result(self.starter_id, "loss")
+                _settle_duel(2, self.bet, self.starter_id)
                 await self._end(inter, f"❌ **AI wins.** You lose **{self.bet}** credits.", disable=True)
                 return
             if c4_full(self.board):
@@ -3038,7 +3460,8 @@ class SpinAgainView(discord.ui.View):
 async def slots_internal(inter_or_ctx: discord.Interaction, bet: int):
     if store.get_balance(inter_or_ctx.user.id) < bet:
         return await inter_or_ctx.followup.send("❌ Not enough credits for that bet.", ephemeral=True)
-    final_reels = [random.choice(SLOT_SYMBOLS) for _ in range(3)]
+    rng = _game_rng.get()
+    final_reels = [rng.choice(SLOT_SYMBOLS) for _ in range(3)]
     spinning = ["⬜", "⬜", "⬜"]
     emb = discord.Embed(title="🎰 Slot Machine")
     emb.add_field(name="Spin", value=" | ".join(spinning), inline=False)
@@ -3050,7 +3473,7 @@ async def slots_internal(inter_or_ctx: discord.Interaction, bet: int):
     reels = spinning[:]; stops = [12,16,20]
     for t in range(max(stops)):
         for i in range(3):
-            if t < stops[i]-1: reels[i] = random.choice(SLOT_SYMBOLS)
+            if t < stops[i]-1: reels[i] = rng.choice(SLOT_SYMBOLS)
             elif t == stops[i]-1: reels[i] = final_reels[i]
         try:
             anim = discord.Embed(title="🎰 Slot Machine")
@@ -3062,7 +3485,7 @@ async def slots_internal(inter_or_ctx: discord.Interaction, bet: int):
     best = _best_triplet_with_wilds(final_reels)
     if best is None:
         pair = any(final_reels[i] == final_reels[j] or WILD in (final_reels[i], final_reels[j]) for i in range(3) for j in range(i+1,3))
-        if pair and random.random() < NUDGE_UPGRADE_CHANCE:
+        if pair and rng.random() < NUDGE_UPGRADE_CHANCE:
             target_sym = "7️⃣"
             for sym in ["7️⃣","🍀","⭐","🔔","🍋","🍒"]:
                 c = sum(1 for r in final_reels if r == sym or r == WILD)
@@ -3112,6 +3535,17 @@ async def purge(inter: discord.Interaction, limit: app_commands.Range[int, 1, 10
     except discord.HTTPException as e:
         await inter.followup.send(f"Error while deleting: {e}", ephemeral=True)
 
+_AUTODELETE_DURATION_RE = re.compile(r"^(\d+)\s*([sm]?)$")
+
+def _fmt_duration(secs: int) -> str:
+    if secs < 60:
+        return f"{secs} seconds"
+    if secs % 3600 == 0:
+        return f"{secs // 3600} hours"
+    if secs % 60 == 0:
+        return f"{secs // 60} minutes"
+    return f"{secs // 60} minutes {secs % 60} seconds"
+
 @tree.command(name="autodelete_set", description="Enable auto-delete for this channel after N seconds or minutes.")
 @app_commands.describe(duration="Delete after this many seconds (e.g., 10s) or minutes (e.g., 2m or just 2)")
 @require_admin_or_allowlisted()
@@ -3120,22 +3554,15 @@ async def autodelete_set(inter: discord.Interaction, duration: str):
         return await inter.response.send_message("Use this in a text channel.", ephemeral=True)
 
     s = duration.strip().lower()
-    # Parse duration -> seconds
-    if s.endswith("s"):
-        try:
-            seconds = int(s[:-1])
-        except ValueError:
+    # Parse duration -> seconds (no unit defaults to minutes)
+    m = _AUTODELETE_DURATION_RE.match(s)
+    if not m:
+        if s.endswith("s"):
             return await inter.response.send_message("Invalid seconds format. Try like **10s**.", ephemeral=True)
-    elif s.endswith("m"):
-        try:
-            seconds = int(s[:-1]) * 60
-        except ValueError:
+        if s.endswith("m"):
             return await inter.response.send_message("Invalid minutes format. Try like **2m**.", ephemeral=True)
-    else:
-        try:
-            seconds = int(s) * 60  # default to minutes if no unit
-        except ValueError:
-            return await inter.response.send_message("Invalid format. Use **10s**, **2m**, or a number for minutes.", ephemeral=True)
+        return await inter.response.send_message("Invalid format. Use **10s**, **2m**, or a number for minutes.", ephemeral=True)
+    seconds = int(m.group(1)) * (1 if m.group(2) == "s" else 60)
 
     # Validate range
     if seconds < 5 or seconds > 86400:
@@ -3143,17 +3570,7 @@ async def autodelete_set(inter: discord.Interaction, duration: str):
 
     store.set_autodelete(inter.channel.id, int(seconds))
 
-    # Nice confirmation text
-    if seconds < 60:
-        time_str = f"{seconds} seconds"
-    elif seconds % 3600 == 0:
-        time_str = f"{seconds // 3600} hours"
-    elif seconds % 60 == 0:
-        time_str = f"{seconds // 60} minutes"
-    else:
-        time_str = f"{seconds // 60} minutes {seconds % 60} seconds"
-
-    await inter.response.send_message(f"🗑️ Auto-delete enabled: older than **{time_str}**.", ephemeral=True)
+    await inter.response.send_message(f"🗑️ Auto-delete enabled: older than **{_fmt_duration(seconds)}**.", ephemeral=True)
 @tree.command(name="autodelete_disable", description="Disable auto-delete for this channel.")
 @require_admin_or_allowlisted()
 async def autodelete_disable(inter: discord.Interaction):
@@ -3165,21 +3582,9 @@ async def autodelete_disable(inter: discord.Interaction):
 async def autodelete_status(inter: discord.Interaction):
     if not isinstance(inter.channel, (discord.TextChannel, discord.Thread)):
         return await inter.response.send_message("Use this in a text channel.", ephemeral=True)
-    conf = store.get_autodelete(); secs = conf.get(str(inter.channel.id))
+    secs = store.get_autodelete_seconds(inter.channel.id)
     if secs:
-        try:
-            secs = int(secs)
-        except Exception:
-            secs = int(float(secs))
-        if secs < 60:
-            time_str = f"{secs} seconds"
-        elif secs % 3600 == 0:
-            time_str = f"{secs // 3600} hours"
-        elif secs % 60 == 0:
-            time_str = f"{secs // 60} minutes"
-        else:
-            time_str = f"{secs // 60} minutes {secs % 60} seconds"
-        await inter.response.send_message(f"✅ Auto-delete is **ON**: older than **{time_str}**.", ephemeral=True)
+        await inter.response.send_message(f"✅ Auto-delete is **ON**: older than **{_fmt_duration(secs)}**.", ephemeral=True)
     else:
         await inter.response.send_message("❌ Auto-delete is **OFF** for this channel.", ephemeral=True)
 
@@ -3189,29 +3594,17 @@ async def autodelete_list(inter: discord.Interaction):
     conf = store.get_autodelete()
     if not conf:
         return await inter.response.send_message("No auto-delete rules are set.", ephemeral=True)
+    # Channel lookups may hit the API; ack first so we never miss the 3s window
+    await inter.response.defer(ephemeral=True)
 
     # Normalize into list of (channel_object_or_none, channel_id_str, seconds)
     rows = []
     for chan_id, secs in conf.items():
         try:
-            secs = int(secs)
-        except Exception:
-            secs = int(float(secs))
-        try:
-            channel = await bot.fetch_channel(int(chan_id))
+            channel = await _resolve_channel(chan_id)
         except Exception:
             channel = None
-        rows.append((channel, str(chan_id), int(secs)))
-
-    # Human formatter
-    def _fmt_secs(secs: int) -> str:
-        if secs < 60:
-            return f"{secs} seconds"
-        if secs % 3600 == 0:
-            return f"{secs // 3600} hours"
-        if secs % 60 == 0:
-            return f"{secs // 60} minutes"
-        return f"{secs // 60} minutes {secs % 60} seconds"
+        rows.append((channel, str(chan_id), secs))
 
     instant = [r for r in rows if r[2] < 60]
     scheduled = [r for r in rows if r[2] >= 60]
@@ -3232,14 +3625,14 @@ async def autodelete_list(inter: discord.Interaction):
         lines = []
         for ch, cid, secs in instant:
             label = f"#{ch.name}" if getattr(ch, "name", None) else f"<#{cid}>"
-            lines.append(f"{label} — {_fmt_secs(secs)}")
+            lines.append(f"{label} — {_fmt_duration(secs)}")
         emb.add_field(name="Instant (< 60s)", value="\n".join(lines)[:1024], inline=False)
 
     if scheduled:
         lines = []
         for ch, cid, secs in scheduled:
             label = f"#{ch.name}" if getattr(ch, "name", None) else f"<#{cid}>"
-            lines.append(f"{label} — {_fmt_secs(secs)}")
+            lines.append(f"{label} — {_fmt_duration(secs)}")
         # Discord field limit handling (split if long)
         chunk = ""
         for line in lines:
@@ -3253,7 +3646,7 @@ async def autodelete_list(inter: discord.Interaction):
     total = len(rows)
     emb.description = f"**{total}** channel{'s' if total != 1 else ''} with auto-delete enabled."
 
-    await inter.response.send_message(embed=emb, ephemeral=True)
+    await inter.followup.send(embed=emb, ephemeral=True)
 
 # ---------- Leaderboard & Achievements ----------
 @tree.command(name="leaderboard", description="Show the top players.")
@@ -3262,15 +3655,16 @@ async def autodelete_list(inter: discord.Interaction):
 async def leaderboard(inter: discord.Interaction, category: app_commands.Choice[str]):
     top = store.list_top(category.value, 10)
     if not top: return await inter.response.send_message("No data yet.")
+    await inter.response.defer()
+    users = await _resolve_users(uid for uid, _ in top)  # cached users free, misses fetched together
+    unit = 'credits' if category.value=='balance' else 'wins'
     lines = []
     for i, (uid, val) in enumerate(top, start=1):
-        try:
-            user = await bot.fetch_user(uid); uname = user.display_name
-        except Exception:
-            uname = f"User {uid}"
-        lines.append(f"**{i}. {uname}** — {val} {'credits' if category.value=='balance' else 'wins'}")
+        u = users.get(uid)
+        uname = u.display_name if u else f"User {uid}"
+        lines.append(f"**{i}. {uname}** — {val} {unit}")
     emb = discord.Embed(title=f"🏆 Leaderboard — {category.value.capitalize()}", description="\n".join(lines))
-    await inter.response.send_message(embed=emb)
+    await inter.followup.send(embed=emb)
 
 @tree.command(name="achievements", description="Show your achievements (or another user's).")
 async def achievements(inter: discord.Interaction, user: Optional[discord.User] = None):
@@ -3283,38 +3677,74 @@ async def achievements(inter: discord.Interaction, user: Optional[discord.User]
     await inter.response.send_message(embed=emb)
 
 # ---------- Background Cleaner ----------
+# channel_id -> (ttl seconds, epoch when its oldest surviving message expires). A channel is only
+# purged once that time has passed; no entry (or a changed TTL) means "unknown, check it".
+_cleanup_due: Dict[int, Tuple[int, float]] = {}
+
+def _note_cleanup_message(message: discord.Message, secs: int):
+    # A new message can only make a known channel due sooner; unknown channels get checked anyway
+    hit = _cleanup_due.get(message.channel.id)
+    if hit and hit[0] == secs:
+        _cleanup_due[message.channel.id] = (secs, min(hit[1], message.created_at.timestamp() + secs))
+
 @tasks.loop(minutes=2)
 async def cleanup_loop():
     conf = store.get_autodelete()
     if not conf: return
-    now = datetime.now(timezone.utc)
-    for chan_id, secs in list(conf.items()):
-        channel = bot.get_channel(int(chan_id))
+    now_ts = time.time()
+    now = datetime.fromtimestamp(now_ts, timezone.utc)  # only needed for purge's before= bound
+    # Channels are purged concurrently; the semaphore keeps us from bursting
+    # every channel's history/bulk-delete calls at once.
+    sem = asyncio.Semaphore(CLEANUP_CONCURRENCY)
+
+    async def _purge_one(channel, secs, cutoff):
+        async with sem:
+            scanned = 0
+            def _unpinned(m):
+                nonlocal scanned
+                scanned += 1
+                return not getattr(m, "pinned", False)
+            try:
+                # before=cutoff makes Discord return only expired messages, so nothing is
+                # fetched just to be filtered out client-side
+                await channel.purge(limit=CLEANUP_PURGE_LIMIT, before=cutoff, check=_unpinned, bulk=True)
+                if scanned >= CLEANUP_PURGE_LIMIT:
+                    due = 0.0  # hit the cap; more expired backlog, keep going next tick
+                else:
+                    # Next due = when the oldest unpinned survivor expires (capped so unpins etc. get picked up)
+                    due = time.time() + CLEANUP_RECHECK_SECONDS
+                    async for m in channel.history(limit=50, after=cutoff, oldest_first=True):
+                        if not m.pinned:
+                            due = min(due, m.created_at.timestamp() + secs)
+                            break
+                _cleanup_due[channel.id] = (secs, due)
+            except (discord.Forbidden, discord.HTTPException):
+                pass
+
+    jobs = []
+    for chan_id, secs in conf.items():
+        channel = bot.get_channel(chan_id)
         if not isinstance(channel, (discord.TextChannel, discord.Thread)):
             continue
-        try:
-            secs = int(secs)
-        except Exception:
-            secs = int(float(secs))
         # Skip short TTLs (<60s); those are handled by per-message deletes.
         if secs < 60:
             continue
-        cutoff = now - timedelta(seconds=int(secs))
-        try:
-            await channel.purge(
-                limit=1000,
-                check=lambda m: (not getattr(m, "pinned", False)) and (m.created_at < cutoff),
-                bulk=True,
-            )
-        except (discord.Forbidden, discord.HTTPException):
-            continue
+        hit = _cleanup_due.get(chan_id)
+        if hit and hit[0] == secs and hit[1] > now_ts:
+            continue  # nothing in this channel has expired yet
+        jobs.append(_purge_one(channel, secs, now - timedelta(seconds=secs)))
+    if jobs:
+        # one channel's unexpected error must not cancel the rest or stop the loop
+        for r in await asyncio.gather(*jobs, return_exceptions=True):
+            if isinstance(r, Exception):
+                print(f"[cleanup] purge failed: {type(r).__name__}: {r}")
 
 @cleanup_loop.before_loop
 async def before_cleanup():
     await bot.wait_until_ready()
 
 # ---- /shorten (Kutt v2+v3 compatible) --------------------------------------
-import os, requests, discord
+import os, discord
 from urllib.parse import urlparse
 from discord import app_commands
 
@@ -3359,23 +3789,29 @@ async def shorten(interaction: discord.Interaction, url: str, custom: str | None
     endpoint_v3 = f"{KUTT_BASE_URL}/api/v2/links"
     endpoint_v2 = f"{KUTT_BASE_URL}/api/url/submit"
 
+    async def _post(session: aiohttp.ClientSession, endpoint: str):
+        async with session.post(endpoint, json=payload, headers=headers) as r:
+            # json.loads takes the raw bytes; the body is only decoded to text for the failure preview
+            raw = await r.read()
+            try:
+                data = json.loads(raw) if "application/json" in r.headers.get("content-type", "") else {}
+            except Exception:
+                data = {}
+            return r.status, data, raw
+
+    endpoint = endpoint_v3
     try:
-        r = requests.post(endpoint_v3, json=payload, headers=headers, timeout=15)
-        if r.status_code == 404:
-            r = requests.post(endpoint_v2, json=payload, headers=headers, timeout=15)
-    except requests.RequestException as e:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15)) as session:
+            status, data, raw = await _post(session, endpoint)
+            if status == 404:
+                endpoint = endpoint_v2
+                status, data, raw = await _post(session, endpoint)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
         await interaction.followup.send(f"❌ Network error: {e}")
         return
 
-    # Parse response safely
-    ct = r.headers.get("content-type", "")
-    try:
-        data = r.json() if "application/json" in ct else {}
-    except Exception:
-        data = {}
-
     # Success codes for Kutt
-    ok = r.status_code in (200, 201)
+    ok = status in (200, 201)
 
     # v2: { "link": "https://domain/slug", ... }
     link = data.get("link")
@@ -3394,35 +3830,53 @@ async def shorten(interaction: discord.Interaction, url: str, custom: str | None
         await interaction.followup.send(f"🔗 Shortened: {link}")
     else:
         # Helpful debug (trim huge bodies)
-        body_preview = (data or r.text or "")[:500]
+        body_preview = (str(data) if data else raw.decode("utf-8", "replace"))[:500]
         await interaction.followup.send(
             "⚠️ Shorten failed.\n"
-            f"Status: {r.status_code}\n"
-            f"Endpoint: {'v3' if r.request.url.endswith('/api/v2/links') else 'v2'}\n"
+            f"Status: {status}\n"
+            f"Endpoint: {'v3' if endpoint == endpoint_v3 else 'v2'}\n"
             f"Body: {body_preview}"
         )
 # ---------------------------------------------------------------------------
 
 # ---------- Reminders ----------
-def _chicago_tz_for(dt_naive: datetime):
-    if ZoneInfo is not None:
-        try:
-            return ZoneInfo(DEFAULT_TZ_NAME)
-        except Exception:
-            pass
-    y = dt_naive.year
+@functools.lru_cache(maxsize=1)
+def _default_zoneinfo():
+    if ZoneInfo is None:
+        return None
+    try:
+        return ZoneInfo(DEFAULT_TZ_NAME)
+    except Exception:
+        return None
+
+# Fixed-offset fallbacks when tzdata isn't available
+_CT_CDT = timezone(timedelta(hours=-5))
+_CT_CST = timezone(timedelta(hours=-6))
+
+@functools.lru_cache(maxsize=8)
+def _us_dst_bounds(y: int):
     march8 = datetime(y, 3, 8)
     second_sun_march = march8 + timedelta(days=(6 - march8.weekday()) % 7)
     nov1 = datetime(y, 11, 1)
     first_sun_nov = nov1 + timedelta(days=(6 - nov1.weekday()) % 7)
-    is_dst = second_sun_march <= dt_naive < first_sun_nov
-    return timezone(timedelta(hours=-5 if is_dst else -6))
+    return second_sun_march, first_sun_nov
+
+def _chicago_tz_for(dt_naive: datetime):
+    zi = _default_zoneinfo()
+    if zi is not None:
+        return zi
+    second_sun_march, first_sun_nov = _us_dst_bounds(dt_naive.year)
+    return _CT_CDT if second_sun_march <= dt_naive < first_sun_nov else _CT_CST
+
+_DATE_RE = re.compile(r"^(\d{1,2})[/-](\d{1,2})[/-](\d{4})$")
+_DATE_COMPACT_RE = re.compile(r"^(\d{2})(\d{2})(\d{4})$")
+_TIME_RE = re.compile(r"^(\d{1,2}):(\d{2})(am|pm)?$")
+_TIME_COMPACT_RE = re.compile(r"^(\d{2})(\d{2})(am|pm)?$")
+_OFFSET_RE = re.compile(r"^([+-])(\d{1,2}):?(\d{2})$")
 
 def _parse_date(date_str: str):
     s = date_str.strip()
-    m = re.match(r"^(\d{1,2})[/-](\d{1,2})[/-](\d{4})$", s)
-    if not m:
-        m = re.match(r"^(\d{2})(\d{2})(\d{4})$", s)
+    m = _DATE_RE.match(s) or _DATE_COMPACT_RE.match(s)
     if not m:
         raise ValueError("Date must be MM-DD-YYYY (also accepts MM/DD/YYYY or MMDDYYYY).")
     mm, dd, yyyy = map(int, m.groups())
@@ -3430,7 +3884,7 @@ def _parse_date(date_str: str):
 
 def _parse_time(time_str: str):
     t = time_str.strip().lower().replace(" ", "")
-    m = re.match(r"^(\d{1,2}):(\d{2})(am|pm)?$", t) or re.match(r"^(\d{2})(\d{2})(am|pm)?$", t)
+    m = _TIME_RE.match(t) or _TIME_COMPACT_RE.match(t)
     if not m:
         raise ValueError("Time must be HH:MM (24h), HHMM, or h:mma/pm.")
     hh, mi, ampm = m.groups()
@@ -3443,7 +3897,7 @@ def _parse_time(time_str: str):
 
 def _parse_offset(s: Optional[str]) -> Optional[timezone]:
     if not s: return None
-    off = re.match(r"^([+-])(\d{1,2}):?(\d{2})$", s.strip())
+    off = _OFFSET_RE.match(s.strip())
     if not off: raise ValueError("Timezone offset must look like -05:00 or +0530.")
     sign, oh, om = off.groups()
     delta = timedelta(hours=int(oh), minutes=int(om))
@@ -3455,13 +3909,9 @@ def _parse_offset(s: Optional[str]) -> Optional[timezone]:
 async def remind_in(inter: discord.Interaction, minutes: app_commands.Range[int, 1, 60*24*30], message: str, dm: bool = False):
     await inter.response.defer(ephemeral=True)
     due_utc = datetime.now(timezone.utc) + timedelta(minutes=int(minutes))
-    rid = store.add_reminder({
-        "user_id": inter.user.id,
-        "channel_id": None if dm else inter.channel.id,
-        "dm": bool(dm),
-        "text": message,
-        "due_utc": due_utc.isoformat(),
-    })
+    due_ts = int(due_utc.timestamp())
+    rid = await asyncio.to_thread(store.add_reminder, inter.user.id, None if dm else inter.channel.id, dm, message, due_ts)
+    _note_reminder_due(due_ts)
     await inter.followup.send(f"⏰ Reminder **#{rid}** set for in **{minutes}m** — _{message}_", ephemeral=True)
 
 @tree.command(name="remind_at", description="Schedule a reminder at a specific date/time.")
@@ -3476,13 +3926,9 @@ async def remind_at(inter: discord.Interaction, date: str, time: str, message: s
         due_utc = local_dt.astimezone(timezone.utc)
         if due_utc <= datetime.now(timezone.utc) + timedelta(seconds=5):
             return await inter.followup.send("That time is in the past. Pick something in the future.", ephemeral=True)
-        rid = store.add_reminder({
-            "user_id": inter.user.id,
-            "channel_id": None if dm else inter.channel.id,
-            "dm": bool(dm),
-            "text": message,
-            "due_utc": due_utc.isoformat(),
-        })
+        due_ts = int(due_utc.timestamp())
+        rid = await asyncio.to_thread(store.add_reminder, inter.user.id, None if dm else inter.channel.id, dm, message, due_ts)
+        _note_reminder_due(due_ts)
         when_text = local_dt.strftime("%m-%d-%Y %H:%M %Z")
         await inter.followup.send(f"⏰ Reminder **#{rid}** set for **{when_text}** — _{message}_", ephemeral=True)
     except Exception as e:
@@ -3491,18 +3937,17 @@ async def remind_at(inter: discord.Interaction, date: str, time: str, message: s
 @tree.command(name="reminders", description="List your pending reminders.")
 async def reminders_cmd(inter: discord.Interaction):
     await inter.response.defer(ephemeral=True)
-    now_ct = datetime.now(timezone.utc)
+    now_ts = int(datetime.now(timezone.utc).timestamp())
     items = store.list_reminders(inter.user.id)
     if not items:
         return await inter.followup.send("No pending reminders.", ephemeral=True)
-    lines = []
-    for r in items:
-        due = datetime.fromisoformat(r["due_utc"]).replace(tzinfo=timezone.utc)
-        remaining = int((due - now_ct).total_seconds())
-        if remaining < 0: remaining = 0
-        local = due.astimezone(_chicago_tz_for(datetime.now()))
-        lines.append(f"**#{r.get('id','?')}** — {local.strftime('%m-%d-%Y %H:%M %Z')}  -  in ~{remaining//3600}h {(remaining%3600)//60}m — _{r['text']}_")
-    await inter.followup.send("\n".join(lines), ephemeral=True)
+    tz_ct = _chicago_tz_for(datetime.now())
+    def _line(r: dict) -> str:
+        hours, rem = divmod(max(0, r["due_ts"] - now_ts), 3600)
+        # %Z stays per row: a list can straddle a DST change (CDT vs CST)
+        return f"**#{r['id']}** — {datetime.fromtimestamp(r['due_ts'], tz_ct):%m-%d-%Y %H:%M %Z}  -  in ~{hours}h {rem // 60}m — _{discord.utils.escape_markdown(r['text'])}_"
+    for chunk in _chunk_lines([_line(r) for r in items]):
+        await inter.followup.send(chunk, ephemeral=True)
 
 @tree.command(name="remind_cancel", description="Cancel a reminder by id.")
 @app_commands.describe(reminder_id="The #id from /reminders")
@@ -3517,48 +3962,133 @@ async def remind_cancel(inter: discord.Interaction, reminder_id: int):
     ok = store.cancel_reminder(reminder_id, requester_id=inter.user.id, is_mod=is_mod)
     await inter.followup.send("Canceled." if ok else "Couldn't cancel.", ephemeral=True)
 
-@tasks.loop(seconds=REMINDER_TICK_SECONDS)
-async def reminders_scheduler():
+async def _deliver_reminder(r: dict):
     try:
-        now = datetime.now(timezone.utc)
-        items = store.list_reminders(None)
-        for r in items:
-            due = datetime.fromisoformat(r["due_utc"]).replace(tzinfo=timezone.utc)
-            if due <= now:
-                try:
-                    user = await bot.fetch_user(int(r["user_id"]))
-                    text = f"⏰ Reminder: {r['text']}"
-                    if r.get("dm") or not r.get("channel_id"):
-                        await user.send(text)
-                    else:
-                        chan = bot.get_channel(int(r["channel_id"]))
-                        if chan:
-                            await chan.send(f"{user.mention} {text}")
-                        else:
-                            await user.send(text)
-                except Exception:
-                    pass
-                store.cancel_reminder(int(r.get("id", 0)), requester_id=int(r.get("user_id")), is_mod=True)
-    except Exception:
-        pass
+        user = await _resolve_user(r["user_id"])
+        text = f"⏰ Reminder: {r['text']}"
+        if r["dm"] or not r["channel_id"]:
+            await _notify(user, text)
+        else:
+            chan = bot.get_channel(r["channel_id"])
+            if chan:
+                await _notify(chan, f"{user.mention} {text}")
+            else:
+                await _notify(user, text)
+    except (discord.HTTPException, asyncio.TimeoutError) as e:
+        # Blocked DMs, deleted channels, API hiccups: the reminder is dropped either way.
+        _log_reminder_error("delivery failed", e)
+
+_reminder_log_at = 0.0
+
+def _log_reminder_error(what: str, e: BaseException):
+    # At most one line a minute, so a flood of failing sends can't spam the console.
+    global _reminder_log_at
+    now = time.monotonic()
+    if now - _reminder_log_at >= 60:
+        _reminder_log_at = now
+        print(f"[reminders] {what}: {type(e).__name__}: {e}")
+
+REMINDER_BATCH = 100
+
+async def _fire_due_reminders() -> int:
+    now_ts = int(datetime.now(timezone.utc).timestamp())
+    if not store.has_due(now_ts):
+        return 0
+    due = store.list_due_reminders(now_ts, limit=REMINDER_BATCH)
+    # Deliver concurrently so a burst of due reminders costs ~one round-trip, not one each.
+    await asyncio.gather(*(_deliver_reminder(r) for r in due))
+    store.cancel_reminders_bulk([(r["user_id"], r["id"]) for r in due])
+    return len(due)
+
+def _report_task_crash(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[tasks] {task.get_coro().__name__} crashed:")
+        traceback.print_exception(task.exception())
+
+# Set by /remind_in and /remind_at so the scheduler re-plans its sleep immediately.
+reminder_added_event = asyncio.Event()
+_reminders_task: Optional[asyncio.Task] = None
+# Min-heap of due_ts used only to decide how long to sleep. SQLite stays the source of truth,
+# so entries for canceled reminders just cause a harmless early wake-up.
+_reminder_wakeups: List[int] = []
+
+def _note_reminder_due(due_ts: int):
+    heapq.heappush(_reminder_wakeups, int(due_ts))
+    reminder_added_event.set()
+
+async def reminders_scheduler():
+    # Sleeps until the next reminder is due (capped), instead of polling on a fixed tick.
+    await bot.wait_until_ready()
+    _reminder_wakeups[:] = store.list_due_times()
+    heapq.heapify(_reminder_wakeups)
+    while not bot.is_closed():
+        reminder_added_event.clear()
+        try:
+            fired = await _fire_due_reminders()
+        except sqlite3.Error as e:
+            _log_reminder_error("store error", e); fired = 0
+        if fired >= REMINDER_BATCH:
+            continue  # more were due than one batch; go again right away
+        now_ts = int(datetime.now(timezone.utc).timestamp())
+        while _reminder_wakeups and _reminder_wakeups[0] <= now_ts:
+            heapq.heappop(_reminder_wakeups)
+        next_due = _reminder_wakeups[0] if _reminder_wakeups else None
+        sleep_s = REMINDER_MAX_SLEEP_SECONDS if next_due is None else min(REMINDER_MAX_SLEEP_SECONDS, max(1, next_due - now_ts))
+        try:
+            await asyncio.wait_for(reminder_added_event.wait(), timeout=sleep_s)
+        except asyncio.TimeoutError:
+            pass
 
 # ---------- Per-message auto-delete for short TTL channels (<60s) ----------
-async def _schedule_autodelete(message: discord.Message, seconds: int):
+# Messages are queued per channel and deleted in bulk: one pins() lookup and one
+# bulk-delete call per batch instead of a fetch + delete per message.
+AUTODELETE_SLACK_SECONDS = 1.0  # how late a delete may run so neighbours can share its call
+_autodelete_pending: Dict[int, deque] = {}  # channel_id -> deque[(due_monotonic, message_id)]
+_autodelete_flushers: Dict[int, asyncio.Task] = {}
+
+async def _flush_autodelete(channel):
+    q = _autodelete_pending[channel.id]
+    loop = asyncio.get_running_loop()
     try:
-        await asyncio.sleep(max(1, int(seconds)))
-        # Re-fetch before delete to ensure we respect pin status or late edits
-        try:
-            msg = await message.channel.fetch_message(message.id)
-        except Exception:
-            return
-        if getattr(msg, "pinned", False):
-            return  # never delete pins
-        await msg.delete()
-    except (discord.Forbidden, discord.HTTPException):
-        # Lack of perms or already deleted — ignore
-        pass
+        while q:
+            delay = q[0][0] + AUTODELETE_SLACK_SECONDS - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            now = loop.time()
+            ids = []
+            while q and q[0][0] <= now and len(ids) < 100:
+                ids.append(q.popleft()[1])
+            if not ids:
+                continue
+            try:
+                pinned = {m.id for m in await channel.pins()}
+            except Exception:
+                continue  # can't verify pins; never risk deleting one
+            targets = [discord.Object(id=i) for i in ids if i not in pinned]
+            if not targets:
+                continue
+            try:
+                await channel.delete_messages(targets)
+            except (discord.Forbidden, discord.HTTPException):
+                # Bulk delete rejects the whole batch if any message is gone; fall back one by one
+                for t in targets:
+                    try:
+                        await channel.get_partial_message(t.id).delete()
+                    except (discord.Forbidden, discord.HTTPException):
+                        pass
     except Exception:
         pass
+    finally:
+        _autodelete_flushers.pop(channel.id, None)
+        if not q:
+            _autodelete_pending.pop(channel.id, None)
+
+def _schedule_autodelete(message: discord.Message, seconds: int):
+    ch = message.channel
+    due = asyncio.get_running_loop().time() + max(1, int(seconds))
+    _autodelete_pending.setdefault(ch.id, deque()).append((due, message.id))
+    if ch.id not in _autodelete_flushers:
+        _autodelete_flushers[ch.id] = asyncio.create_task(_flush_autodelete(ch))
 
 @bot.event
 async def on_message(message: discord.Message):
@@ -3573,24 +4103,17 @@ async def on_message(message: discord.Message):
     except Exception:
         pass
     try:
-        conf = store.get_autodelete()
-        secs = conf.get(str(message.channel.id))
+        secs = store.get_autodelete_seconds(message.channel.id)
         if not secs:
             return
-        try:
-            secs = int(secs)
-        except Exception:
-            secs = int(float(secs))
         if secs < 60:
-            # Schedule a per-message delete; we will re-check pin before deletion
-            asyncio.create_task(_schedule_autodelete(message, secs))
+            # Queue for the channel's batched delete; pins are re-checked before deletion
+            _schedule_autodelete(message, secs)
+        else:
+            _note_cleanup_message(message, secs)
     except Exception:
         pass
 
-@reminders_scheduler.before_loop
-async def before_reminders():
-    await bot.wait_until_ready()
-
 # ---------- Admin Allowlist Commands (real admins only) ----------
 @tree.command(name="admin_allow", description="Allow a user to use admin bot commands.")
 @require_real_admin()
@@ -3618,20 +4141,19 @@ async def admin_list(inter: discord.Interaction):
     ids = store.list_allowlisted()
     if not ids:
         return await inter.response.send_message("Allowlist is empty.", ephemeral=True)
-    lines = []
-    for uid in ids:
-        try:
-            u = await bot.fetch_user(uid)
-            lines.append(f"- {u.mention} ({u.display_name})")
-        except Exception:
-            lines.append(f"- <@{uid}> (User {uid})")
-    await inter.response.send_message("**Admin allowlist:**\n" + "\n".join(lines), ephemeral=True)
+    await inter.response.defer(ephemeral=True)
+    users = await _resolve_users(ids)
+    lines = [f"- {u.mention} ({u.display_name})" if (u := users.get(uid)) else f"- <@{uid}> (User {uid})" for uid in ids]
+    for chunk in _chunk_lines(["**Admin allowlist:**"] + lines):
+        await inter.followup.send(chunk, ephemeral=True)
 
 
 # ---------- Debug / Health ----------
 @tree.command(name="debug_store", description="Show backend status and table counts.")
 async def debug_store(inter: discord.Interaction):
-    stats = store.get_backend_stats()
+    await inter.response.defer(ephemeral=True)
+    # COUNT(*) over every table scans them all; keep that off the gateway thread
+    stats = await asyncio.to_thread(store.get_backend_stats)
     emb = discord.Embed(title="🧪 Store Health")
     emb.add_field(name="Backend", value=stats["backend"], inline=True)
     emb.add_field(name="DB Path", value=stats["db_path"], inline=False)
@@ -3649,53 +4171,74 @@ async def debug_store(inter: discord.Interaction):
         val = ", ".join(f"{k}:{counts.get(k,0)}" for k in keys)
         if val:
             emb.add_field(name=title, value=val, inline=False)
-    await inter.response.send_message(embed=emb, ephemeral=True)
+    await inter.followup.send(embed=emb, ephemeral=True)
 
 
 # ---------- Startup ----------
+def _commands_hash(guild) -> str:
+    payload = sorted((c.to_dict(tree) for c in tree.get_commands(guild=guild)), key=lambda d: d["name"])
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def _commands_sync_key(guild) -> str:
+    return f"slash_hash:{guild.id if guild else 'global'}"
+
+def _commands_changed(guild) -> bool:
+    # Syncing is rate limited and slow; only push when our definitions actually differ
+    return FORCE_COMMAND_SYNC or store.get_kv(_commands_sync_key(guild)) != _commands_hash(guild)
+
+def _mark_commands_synced(guild):
+    store.set_kv(_commands_sync_key(guild), _commands_hash(guild))
+
 @bot.event
 async def on_ready():
+    global _reminders_task
     # prevent running twice on reconnects
     if getattr(bot, "_ready_once", False):
         return
     bot._ready_once = True
 
-    # --- Slash sync ---
+    # --- Slash sync (skipped when the command payload hasn't changed since the last sync) ---
     try:
         if GUILD_IDS:
             for gid in GUILD_IDS:
                 guild = discord.Object(id=gid)
-                await tree.sync(guild=guild)
-        else:
+                if _commands_changed(guild):
+                    await tree.sync(guild=guild)
+                    _mark_commands_synced(guild)
+        elif _commands_changed(None):
             synced = await tree.sync()  # global sync
+            _mark_commands_synced(None)
             print(f"[slash] Globally synced {len(synced)} commands")
             global_cmds = await tree.fetch_commands()
             print("[slash] Global commands now:", [c.name for c in global_cmds])
+        else:
+            print("[slash] Commands unchanged; skipping sync")
     except Exception as e:
         print("[slash] Global sync error:", e)
 
     # --- Start background loops ---
     if not cleanup_loop.is_running():
         cleanup_loop.start()
-    if not reminders_scheduler.is_running():
-        reminders_scheduler.start()
+    if _reminders_task is None or _reminders_task.done():
+        _reminders_task = asyncio.create_task(reminders_scheduler())
+        _reminders_task.add_done_callback(_report_task_crash)
     if not weather_scheduler.is_running():
         weather_scheduler.start()
 
     
     if not wx_alerts_scheduler.is_running():
-        wx_alerts_scheduler.start()# --- Re-register persistent views ---
-    for mid, p in store.list_open_polls():
-        try:
-            view = PollView(
-                message_id=mid,
-                options=[o["label"] for o in p["options"]],
-                creator_id=p.get("creator_id", 0),
-                timeout=None
-            )
+        wx_alerts_scheduler.start()
+
+    # --- Re-register persistent views (once per process; malformed rows skipped up front) ---
+    polls = [(mid, p) for mid, p in store.list_open_polls()
+             if isinstance(p.get("options"), list) and all(isinstance(o, dict) and "label" in o for o in p["options"])]
+    try:
+        views = [PollView(message_id=mid, options=[o["label"] for o in p["options"]],
+                          creator_id=p.get("creator_id", 0), timeout=None) for mid, p in polls]
+        for view in views:
             bot.add_view(view)
-        except Exception:
-            pass
+    except Exception as e:
+        print("[polls] Failed to restore poll views:", e)
 
     print(f"✅ Logged in as {bot.user} ({bot.user.id})")
 # ---------- Main ----------
@@ -3710,30 +4253,22 @@ def main():
 ROULETTE_RED = {1,3,5,7,9,12,14,16,18,19,21,23,25,27,30,32,34,36}
 ROULETTE_BLACK = {2,4,6,8,10,11,13,15,17,20,22,24,26,28,29,31,33,35}
 
+ROULETTE_WHEEL = (0,32,15,19,4,21,2,25,17,34,6,27,13,36,11,30,8,23,10,5,24,16,33,1,20,14,31,9,22,18,29,7,28,12,35,3,26)
+_WHEEL_INDEX = {n: i for i, n in enumerate(ROULETTE_WHEEL)}
+_WHEEL_SPIN_LEN = len(ROULETTE_WHEEL) * 2 + 12  # a couple of full rotations, then slow down to the slot
+_WHEEL_REPEATED = ROULETTE_WHEEL * 4  # long enough to slice any spin without cycling
+_ROULETTE_COLORS = tuple("🟢 Green" if n == 0 else "🔴 Red" if n in ROULETTE_RED else "⚫ Black" for n in range(37))
+
 def _roulette_spin_sequence(final_number: int):
     # Generate a simple animation sequence that "spins" towards final_number
-    import itertools
-    wheel = [0,32,15,19,4,21,2,25,17,34,6,27,13,36,11,30,8,23,10,5,24,16,33,1,20,14,31,9,22,18,29,7,28,12,35,3,26]
-    # Find index of final_number and build a path that ends there
-    try:
-        idx = wheel.index(final_number)
-    except ValueError:
-        idx = 0
-    seq = []
-    # Spin a couple of full rotations then slow down to the final slot
-    path = list(itertools.islice(itertools.cycle(wheel), idx, idx + len(wheel)*2 + 12))
+    idx = _WHEEL_INDEX.get(final_number, 0)
+    path = list(_WHEEL_REPEATED[idx:idx + _WHEEL_SPIN_LEN])
     # ensure it ends exactly on final_number
     path.append(final_number)
     return path
 
 def _roulette_color(n: int) -> str:
-    if n == 0:
-        return "🟢 Green"
-    if n in ROULETTE_RED:
-        return "🔴 Red"
-    if n in ROULETTE_BLACK:
-        return "⚫ Black"
-    return "Unknown"
+    return _ROULETTE_COLORS[n] if 0 <= n <= 36 else "Unknown"
 
 def _roulette_win_multiplier(choice: str, result: int) -> int:
     c = choice.strip().lower()
@@ -3921,8 +4456,8 @@ class HoldemGame:
         self.bet = int(bet)
         self.p1_id = int(p1_id)
         self.p2_id = int(p2_id) if p2_id else None
-        # Build and shuffle deck
-        self.deck = deal_deck()
+        # Deal from a 12-card sample
+        self.deck = draw_cards(12)  # 4 hole cards + 3 burns + 5 board: all a hand ever uses
         # Hole cards
         self.p1 = [self.deck.pop(), self.deck.pop()]
         self.p2 = [self.deck.pop(), self.deck.pop()] if self.p2_id else [self.deck.pop(), self.deck.pop()]
@@ -4025,33 +4560,13 @@ async def holdem_cmd(inter: discord.Interaction, bet: app_commands.Range[int, 1,
     showdown.add_field(name=f"{p2_name} Hand", value=_hand_name(p2_cat), inline=True)
 
     # Payouts
-    if winner == 1:
-        # player 1 wins the opponent's bet
-        if opponent:
-            store.add_balance(inter.user.id, bet)
-            store.add_balance(opponent.id, -bet)
-            store.add_result(inter.user.id, "win"); store.add_result(opponent.id, "loss")
-            outcome = f"✅ **{p1_name}** wins **{bet}** credits from **{p2_name}**."
-        else:
-            store.add_balance(inter.user.id, bet)
-            store.add_result(inter.user.id, "win")
-            outcome = f"✅ **{p1_name}** beats the AI! +{bet} credits."
-    elif winner == 2:
-        if opponent:
-            store.add_balance(inter.user.id, -bet)
-            store.add_balance(opponent.id, bet)
-            store.add_result(opponent.id, "win"); store.add_result(inter.user.id, "loss")
-            outcome = f"✅ **{p2_name}** wins **{bet}** credits from **{p1_name}**."
-        else:
-            store.add_balance(inter.user.id, -bet)
-            store.add_result(inter.user.id, "loss")
-            outcome = f"❌ AI wins. **-{bet}** credits."
-    else:
-        # Push
-        store.add_result(inter.user.id, "push")
-        if opponent:
-            store.add_result(opponent.id, "push")
-        outcome = "🤝 It's a tie. Push."
+    _settle_duel(winner, bet, inter.user.id, opponent.id if opponent else None)
+    match (winner, bool(opponent)):
+        case (1, True): outcome = f"✅ **{p1_name}** wins **{bet}** credits from **{p2_name}**."
+        case (1, False): outcome = f"✅ **{p1_name}** beats the AI! +{bet} credits."
+        case (2, True): outcome = f"✅ **{p2_name}** wins **{bet}** credits from **{p1_name}**."
+        case (2, False): outcome = f"❌ AI wins. **-{bet}** credits."
+        case _: outcome = "🤝 It's a tie. Push."
 
     showdown.add_field(name="Outcome", value=outcome, inline=False)
     try:
@@ -4144,8 +4659,10 @@ class PollView(discord.ui.View):
 
 async def update_poll_message(channel: discord.abc.Messageable, message_id: int, poll: dict):
     try:
-        if hasattr(channel, "fetch_message"):
-            msg = await channel.fetch_message(message_id)
+        # Edits only need the id, so skip fetching the message; open polls keep their existing
+        # (persistent) buttons, so no new PollView per vote
+        if hasattr(channel, "get_partial_message"):
+            msg = channel.get_partial_message(message_id)
         else:
             return
         total = sum(int(o.get("votes", 0)) for o in poll.get("options", []))
@@ -4156,10 +4673,10 @@ async def update_poll_message(channel: discord.abc.Messageable, message_id: int,
             bars.append(f"**{o.get('label','?')}** — {v} ({pct}%)")
         emb = discord.Embed(title="📊 " + str(poll.get("question","Poll")), description="\n".join(bars))
         emb.set_footer(text=("Open" if poll.get("open", True) else "Closed"))
-        view = None
         if poll.get("open", True):
-            view = PollView(message_id=message_id, options=[o.get("label","?") for o in poll.get("options", [])], creator_id=poll.get("creator_id", 0))
-        await msg.edit(embed=emb, view=view)
+            await msg.edit(embed=emb)
+        else:
+            await msg.edit(embed=emb, view=None)
     except Exception:
         pass
 